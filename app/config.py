@@ -12,9 +12,8 @@ Usage:
 """
 
 import os
-from typing import Optional
+from typing import Optional, NamedTuple
 from pydantic_settings import BaseSettings
-from functools import lru_cache
 
 
 class Settings(BaseSettings):
@@ -23,6 +22,9 @@ class Settings(BaseSettings):
     
     All settings can be overridden via environment variables.
     Example: DATABASE_URL=postgresql://... python main.py
+    
+    Only used to validate env vars / .env once at import.
+    The app reads the frozen copy (see FrozenSettings below).
     """
     
     # ============ APP INFO ============
@@ -43,6 +45,7 @@ class Settings(BaseSettings):
     ALERT_DISTANCE_APPROACHING: int = 1000
     ALERT_DISTANCE_ARRIVING: int = 500
     ALERT_DISTANCE_HERE: int = 100
+    ALERT_CHECK_INTERVAL: float = 1.0  # seconds between alert worker runs
     
     # ============ ETA SETTINGS ============
     AVG_TRUCK_SPEED: float = 12.0
@@ -56,6 +59,18 @@ class Settings(BaseSettings):
     
     # ============ WEBSOCKET SETTINGS ============
     WS_BROADCAST_INTERVAL: int = 3
+    WS_COALESCE_WINDOW: float = 0.2  # seconds a zone's location broadcasts are merged over
+    WS_SEND_TIMEOUT: float = 5.0  # seconds before a stuck client is dropped
+    WS_QUEUE_SIZE: int = 64  # queued messages per socket before a slow client is dropped
+    
+    # ============ LOCATION WRITES ============
+    LOCATION_FLUSH_INTERVAL: float = 0.5  # seconds between batched GPS writes
+    LOCATION_BUFFER_MAX: int = 10000  # buffered history rows before /location answers 503
+    
+    # ============ ZONE LOOKUP ============
+    ZONE_INDEX_TTL: int = 60  # seconds before in-memory zone index is rebuilt
+    TRACKING_CACHE_TTL: float = 2.0  # seconds a cached zone + truck is reused by /track
+    TRUCK_CACHE_TTL: float = 5.0  # seconds /truck/all rows and status counts are reused
     
     # ============ CORS ============
     CORS_ORIGINS: str = "*"
@@ -66,13 +81,27 @@ class Settings(BaseSettings):
         extra = "allow"
 
 
-@lru_cache()
-def get_settings() -> Settings:
-    """Return cached settings instance."""
-    return Settings()
+# Same fields as Settings, but a plain tuple: attribute reads are a
+# simple index lookup instead of going through Pydantic on hot paths.
+FrozenSettings = NamedTuple(
+    "FrozenSettings",
+    [(name, field.annotation) for name, field in Settings.model_fields.items()]
+)
+
+
+def load_settings() -> FrozenSettings:
+    """Validate env vars / .env and return a frozen copy."""
+    validated = Settings()
+    return FrozenSettings(**validated.model_dump(include=set(FrozenSettings._fields)))
 
 
-settings = get_settings()
+# Built once at import - the app-wide singleton
+settings = load_settings()
+
+
+def get_settings() -> FrozenSettings:
+    """Return the settings singleton."""
+    return settings
 
 
 # ============ HELPER FUNCTIONS ============
@@ -85,8 +114,13 @@ def is_postgres() -> bool:
     return settings.DATABASE_URL.startswith("postgresql")
 
 
-def get_cors_origins() -> list:
+# Parsed once at import (CORS_ORIGINS is a comma-separated string)
+CORS_ORIGINS_LIST = (
+    ("*",) if settings.CORS_ORIGINS == "*"
+    else tuple(origin.strip() for origin in settings.CORS_ORIGINS.split(","))
+)
+
+
+def get_cors_origins() -> tuple:
     """Return allowed CORS origins."""
-    if settings.CORS_ORIGINS == "*":
-        return ["*"]
-    return [origin.strip() for origin in settings.CORS_ORIGINS.split(",")]
+    return CORS_ORIGINS_LIST
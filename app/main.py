@@ -5,17 +5,19 @@ Garbage Truck Tracker API
 Main FastAPI application entry point.
 """
 
+import asyncio
 import logging
+import orjson
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 
-from app.config import settings, get_cors_origins
-from app.database import create_tables, engine, get_db
-from app.models import Zone, Truck, User, TruckLocation, AlertLog
-from app.routes import zones, trucks, users, tracking, websocket
+from app.config import settings, CORS_ORIGINS_LIST
+from app.database import create_tables, engine
+from app.routes import ALL_ROUTERS
+from app.services.truck_positions import run_position_flusher, flush_positions
+from app.services.alerts import run_alert_worker, close_http_client
 
 
 # ============ LOGGING SETUP ============
@@ -26,6 +28,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Captured once so the per-request middleware doesn't re-read settings
+DEBUG_ENABLED = settings.DEBUG
+
 
 # ============ LIFESPAN ============
 
@@ -41,12 +46,24 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Database error: {e}")
         raise
     
+    # Build the OpenAPI schema now rather than on the first /docs hit
+    app.openapi()
+    
     logger.info(f"📊 Database: {settings.DATABASE_URL.split('://')[0]}")
     logger.info(f"🔧 Debug mode: {settings.DEBUG}")
     
+    # Write buffered GPS updates in batches
+    flusher = asyncio.create_task(run_position_flusher(settings.LOCATION_FLUSH_INTERVAL))
+    # Check alerts for trucks that sent a location
+    alert_worker = asyncio.create_task(run_alert_worker(settings.ALERT_CHECK_INTERVAL))
+    
     yield
     
     logger.info("👋 Shutting down...")
+    alert_worker.cancel()
+    flusher.cancel()
+    flush_positions()
+    await close_http_client()
     engine.dispose()
 
 
@@ -67,6 +84,7 @@ app = FastAPI(
     """,
     version=settings.APP_VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -76,166 +94,219 @@ app = FastAPI(
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=get_cors_origins(),
+    allow_origins=CORS_ORIGINS_LIST,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    if settings.DEBUG:
-        logger.debug(f"📥 {request.method} {request.url.path}")
-    response = await call_next(request)
-    if settings.DEBUG:
-        logger.debug(f"📤 {response.status_code}")
-    return response
+# Only installed in debug mode - production requests skip it entirely
+if DEBUG_ENABLED:
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        logger.debug("📥 %s %s", request.method, request.url.path)
+        response = await call_next(request)
+        logger.debug("📤 %s", response.status_code)
+        return response
 
 
 # ============ ERROR HANDLERS ============
 
+# Debug mode exposes the exception text; production gets a generic message.
+# Picked once here instead of branching on every error.
+if DEBUG_ENABLED:
+    _error_detail = str
+else:
+    def _error_detail(exc: Exception) -> str:
+        return "An unexpected error occurred"
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled error: {exc}", exc_info=True)
+    logger.error("Unhandled error: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
-            "detail": str(exc) if settings.DEBUG else "An unexpected error occurred"
+            "detail": _error_detail(exc)
         }
     )
 
 
 # ============ INCLUDE ROUTERS ============
 
-app.include_router(zones.router)
-app.include_router(trucks.router)
-app.include_router(users.router)
-app.include_router(tracking.router)
-app.include_router(websocket.router)
+for router in ALL_ROUTERS:
+    app.include_router(router)
 
 
 # ============ ROOT ENDPOINTS ============
+# Payloads are constant, so they're encoded once at import
+# and the same Response is returned on every hit.
+
+def _json_response(data: dict) -> Response:
+    return Response(content=orjson.dumps(data), media_type="application/json")
+
+
+_ROOT_RESPONSE = _json_response({
+    "name": settings.APP_NAME,
+    "version": settings.APP_VERSION,
+    "status": "running",
+    "docs": "/docs",
+    "endpoints": {
+        "zones": "/zones - Zone management (Admin)",
+        "trucks": "/truck - Truck & driver management",
+        "users": "/user - User registration & settings",
+        "tracking": "/track - Live tracking",
+        "websocket": "/ws/track/{user_id} - Real-time WebSocket"
+    }
+})
+
+_HEALTH_RESPONSE = _json_response({
+    "status": "healthy",
+    "version": settings.APP_VERSION,
+    "database": "connected"
+})
+
+_PING_RESPONSE = Response(content=b'{"ping":"pong"}', media_type="application/json")
+
+_CONFIG_RESPONSE = _json_response({
+    "location_update_interval": settings.LOCATION_UPDATE_INTERVAL,
+    "alert_distance_approaching": settings.ALERT_DISTANCE_APPROACHING,
+    "alert_distance_arriving": settings.ALERT_DISTANCE_ARRIVING,
+    "alert_distance_here": settings.ALERT_DISTANCE_HERE,
+    "ws_broadcast_interval": settings.WS_BROADCAST_INTERVAL
+})
+
 
 @app.get("/", tags=["Health"])
 def root():
     """API root - shows available endpoints."""
-    return {
-        "name": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "status": "running",
-        "docs": "/docs",
-        "endpoints": {
-            "zones": "/zones - Zone management (Admin)",
-            "trucks": "/truck - Truck & driver management",
-            "users": "/user - User registration & settings",
-            "tracking": "/track - Live tracking",
-            "websocket": "/ws/track/{user_id} - Real-time WebSocket"
-        }
-    }
+    return _ROOT_RESPONSE
 
 
 @app.get("/health", tags=["Health"])
 def health_check():
     """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "version": settings.APP_VERSION,
-        "database": "connected"
-    }
+    return _HEALTH_RESPONSE
+
+
+@app.get("/ping", tags=["Health"])
+def ping():
+    """Lightweight liveness probe for uptime monitors."""
+    return _PING_RESPONSE
 
 
 @app.get("/config", tags=["Health"])
 def get_config():
     """Get public configuration for client apps."""
-    return {
-        "location_update_interval": settings.LOCATION_UPDATE_INTERVAL,
-        "alert_distance_approaching": settings.ALERT_DISTANCE_APPROACHING,
-        "alert_distance_arriving": settings.ALERT_DISTANCE_ARRIVING,
-        "alert_distance_here": settings.ALERT_DISTANCE_HERE,
-        "ws_broadcast_interval": settings.WS_BROADCAST_INTERVAL
-    }
+    return _CONFIG_RESPONSE
 
 
 # ============ DEBUG ENDPOINTS ============
 
-@app.get("/debug/db", tags=["Debug"])
-def debug_database(db: Session = Depends(get_db)):
-    """
-    Debug endpoint to see database state.
-    
-    ⚠️ Only available when DEBUG=true
-    """
-    if not settings.DEBUG:
-        return {"error": "Debug endpoint disabled in production"}
+# Only registered in debug mode (their imports too)
+if DEBUG_ENABLED:
+    from fastapi import Depends
+    from sqlalchemy import select, func
+    from sqlalchemy.orm import Session
+
+    from app.database import get_db
+    from app.models import Zone, Truck, User, TruckLocation, AlertLog
+    from app.services.zone_index import invalidate_zone_index
+    from app.routes.trucks import invalidate_truck_caches
+    from app.services.truck_positions import clear_positions
+
+    @app.get("/debug/db", tags=["Debug"])
+    def debug_database(db: Session = Depends(get_db)):
+        """
+        Debug endpoint to see database state.
     
-    zones = db.query(Zone).all()
-    trucks = db.query(Truck).all()
-    users = db.query(User).all()
-    locations_count = db.query(TruckLocation).count()
-    alerts_count = db.query(AlertLog).count()
+        ⚠️ Only available when DEBUG=true
+        """
+        # Plain column tuples - no ORM objects to build and throw away
+        zones = db.execute(select(
+            Zone.id, Zone.name, Zone.min_lat, Zone.min_lng,
+            Zone.max_lat, Zone.max_lng, Zone.is_active
+        )).mappings()
+        trucks = db.execute(select(
+            Truck.id, Truck.vehicle_number, Truck.zone_id, Truck.is_active,
+            Truck.last_lat, Truck.last_lng
+        )).mappings()
+        users = db.execute(select(
+            User.id, User.name, User.phone, User.home_lat, User.home_lng,
+            User.zone_id, User.alert_type
+        )).mappings()
+        
+        # All five counts in a single round trip
+        counts = db.execute(select(
+            select(func.count()).select_from(Zone).scalar_subquery(),
+            select(func.count()).select_from(Truck).scalar_subquery(),
+            select(func.count()).select_from(User).scalar_subquery(),
+            select(func.count()).select_from(TruckLocation).scalar_subquery(),
+            select(func.count()).select_from(AlertLog).scalar_subquery()
+        )).one()
     
-    return {
-        "zones": [
-            {
-                "id": z.id, 
-                "name": z.name, 
-                "bounds": f"({z.min_lat},{z.min_lng}) to ({z.max_lat},{z.max_lng})",
-                "active": z.is_active
-            } 
-            for z in zones
-        ],
-        "trucks": [
-            {
-                "id": t.id, 
-                "vehicle": t.vehicle_number, 
-                "zone_id": t.zone_id, 
-                "active": t.is_active,
-                "location": f"({t.last_lat},{t.last_lng})" if t.last_lat else "No location"
-            } 
-            for t in trucks
-        ],
-        "users": [
-            {
-                "id": u.id, 
-                "name": u.name, 
-                "phone": u.phone,
-                "home": f"({u.home_lat},{u.home_lng})" if u.home_lat else "No home",
-                "zone_id": u.zone_id,
-                "alerts": u.alert_type
-            } 
-            for u in users
-        ],
-        "stats": {
-            "total_zones": len(zones),
-            "total_trucks": len(trucks),
-            "total_users": len(users),
-            "total_locations": locations_count,
-            "total_alerts": alerts_count
+        return {
+            "zones": [
+                {
+                    "id": z["id"], 
+                    "name": z["name"], 
+                    "bounds": f"({z['min_lat']},{z['min_lng']}) to ({z['max_lat']},{z['max_lng']})",
+                    "active": z["is_active"]
+                } 
+                for z in zones
+            ],
+            "trucks": [
+                {
+                    "id": t["id"], 
+                    "vehicle": t["vehicle_number"], 
+                    "zone_id": t["zone_id"], 
+                    "active": t["is_active"],
+                    "location": f"({t['last_lat']},{t['last_lng']})" if t["last_lat"] else "No location"
+                } 
+                for t in trucks
+            ],
+            "users": [
+                {
+                    "id": u["id"], 
+                    "name": u["name"], 
+                    "phone": u["phone"],
+                    "home": f"({u['home_lat']},{u['home_lng']})" if u["home_lat"] else "No home",
+                    "zone_id": u["zone_id"],
+                    "alerts": u["alert_type"]
+                } 
+                for u in users
+            ],
+            "stats": {
+                "total_zones": counts[0],
+                "total_trucks": counts[1],
+                "total_users": counts[2],
+                "total_locations": counts[3],
+                "total_alerts": counts[4]
+            }
         }
-    }
 
 
-@app.delete("/debug/reset", tags=["Debug"])
-def reset_database(confirm: bool = False, db: Session = Depends(get_db)):
-    """
-    Reset database (delete all data).
-    
-    ⚠️ DANGEROUS! Requires confirm=true parameter.
-    """
-    if not settings.DEBUG:
-        return {"error": "Debug endpoint disabled in production"}
+    @app.delete("/debug/reset", tags=["Debug"])
+    def reset_database(confirm: bool = False, db: Session = Depends(get_db)):
+        """
+        Reset database (delete all data).
     
-    if not confirm:
-        return {"error": "Pass confirm=true to reset database"}
+        ⚠️ DANGEROUS! Requires confirm=true parameter.
+        """
+        if not confirm:
+            return {"error": "Pass confirm=true to reset database"}
     
-    # Delete in order (foreign key constraints)
-    db.query(AlertLog).delete()
-    db.query(TruckLocation).delete()
-    db.query(User).delete()
-    db.query(Truck).delete()
-    db.query(Zone).delete()
-    db.commit()
+        # Delete in order (foreign key constraints)
+        db.query(AlertLog).delete()
+        db.query(TruckLocation).delete()
+        db.query(User).delete()
+        db.query(Truck).delete()
+        db.query(Zone).delete()
+        db.commit()
+        clear_positions()
+        invalidate_zone_index()
+        invalidate_truck_caches()
     
-    return {"message": "Database reset complete", "status": "empty"}
\ No newline at end of file
+        return {"message": "Database reset complete", "status": "empty"}
\ No newline at end of file
@@ -19,14 +19,40 @@ Relationships:
 """
 
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, Boolean,
-    ForeignKey, Date, Time, Text, Index
+    Column, Integer, SmallInteger, String, Float, DateTime, Boolean,
+    ForeignKey, Date, Time, Text, Index, PrimaryKeyConstraint
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from app.database import Base
 
 
+class ScaledSmallInteger(TypeDecorator):
+    """
+    Low-precision float stored as a 2-byte SmallInteger.
+    
+    Python side always sees a float; the DB stores round(value * scale).
+    e.g. scale=10 keeps one decimal place: 12.3 km/h -> 123
+    """
+    impl = SmallInteger
+    cache_ok = True
+    
+    def __init__(self, scale: int = 1):
+        super().__init__()
+        self.scale = scale
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return max(-32768, min(32767, int(round(value * self.scale))))
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value / self.scale
+
+
 class Zone(Base):
     """
     Service Zone / Ward
@@ -101,8 +127,8 @@ class Truck(Base):
     # Cached latest location (for fast queries without joining)
     last_lat = Column(Float, nullable=True)
     last_lng = Column(Float, nullable=True)
-    last_speed = Column(Float, default=0)       # km/h
-    last_heading = Column(Float, default=0)     # 0-360 degrees
+    last_speed = Column(ScaledSmallInteger(10), default=0)  # km/h (0.1 precision)
+    last_heading = Column(ScaledSmallInteger(), default=0)  # 0-360 degrees
     last_update = Column(DateTime, nullable=True)
     
     created_at = Column(DateTime, server_default=func.now())
@@ -129,16 +155,16 @@ class TruckLocation(Base):
     """
     __tablename__ = "truck_locations"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # Primary key is (truck_id, captured_at) - see __table_args__
     truck_id = Column(Integer, ForeignKey("trucks.id", ondelete="CASCADE"), 
                       nullable=False)
     
     # GPS data
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
-    speed = Column(Float, default=0)            # km/h
-    heading = Column(Float, default=0)          # 0-360 degrees
-    accuracy = Column(Float, nullable=True)     # GPS accuracy in meters
+    speed = Column(ScaledSmallInteger(10), default=0)      # km/h (0.1 precision)
+    heading = Column(ScaledSmallInteger(), default=0)      # 0-360 degrees
+    accuracy = Column(ScaledSmallInteger(), nullable=True) # GPS accuracy in meters
     
     # Timestamps
     captured_at = Column(DateTime, nullable=False)  # When GPS captured on device
@@ -150,10 +176,17 @@ class TruckLocation(Base):
     # Relationship
     truck = relationship("Truck", back_populates="locations")
     
-    # Index for efficient queries
+    # Composite primary key doubles as the time index (one B-tree per insert).
+    # On PostgreSQL the GPS fields are INCLUDEd so reads are index-only.
+    # On SQLite a re-sent point (same truck + timestamp) is silently skipped.
     __table_args__ = (
-        Index('idx_truck_location_time', 'truck_id', 'captured_at'),
+        PrimaryKeyConstraint('truck_id', 'captured_at',
+                             postgresql_include=['latitude', 'longitude',
+                                                 'speed', 'heading'],
+                             sqlite_on_conflict='IGNORE'),
     )
+    # PK is client-supplied, so inserts never need RETURNING
+    __mapper_args__ = {"eager_defaults": False}
     
     def __repr__(self):
         return f"<TruckLocation {self.latitude},{self.longitude}>"
@@ -204,6 +237,13 @@ class User(Base):
     alert_logs = relationship("AlertLog", back_populates="user",
                              cascade="all, delete-orphan")
     
+    # Alert checks, broadcasts and zone stats all filter on zone + active;
+    # alert checks also range-scan home_lat within the truck's box
+    __table_args__ = (
+        Index('idx_users_zone_active', 'zone_id', 'is_active'),
+        Index('idx_users_zone_home', 'zone_id', 'home_lat', 'home_lng'),
+    )
+    
     def __repr__(self):
         return f"<User {self.name}>"
 
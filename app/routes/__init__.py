@@ -7,4 +7,13 @@ All API route modules.
 
 from app.routes import zones, trucks, users, tracking, websocket
 
-__all__ = ["zones", "trucks", "users", "tracking", "websocket"]
\ No newline at end of file
+# Every router the app serves, registered in this order by main.py
+ALL_ROUTERS = (
+    zones.router,
+    trucks.router,
+    users.router,
+    tracking.router,
+    websocket.router,
+)
+
+__all__ = ["zones", "trucks", "users", "tracking", "websocket", "ALL_ROUTERS"]
\ No newline at end of file
@@ -1 +0,0 @@
-## no need
\ No newline at end of file
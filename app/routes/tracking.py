@@ -11,6 +11,8 @@ IMPORTANT: Static routes must come BEFORE dynamic routes!
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -19,14 +21,16 @@ from app.database import get_db
 from app.models import User, Zone, Truck, TruckLocation
 from app.schemas import (
     TrackingResponse, TruckInfo, DistanceInfo, ETAInfo, ZoneInfo,
-    DutyInfo, AlertInfo, TruckStatus, RouteResponse, RoutePoint
+    DutyInfo, AlertInfo, TruckStatus, RouteResponse
 )
 from app.services.location import (
-    haversine_distance, format_distance, estimate_eta,
+    haversine_distance, haversine_from, bounding_box, simplify_route, format_distance, estimate_eta,
     format_time_ago, format_time, format_duration,
     determine_truck_status
 )
 from app.services.alerts import get_alert_info_for_user
+from app.services.truck_positions import overlay_pending_position, pending_truck_ids
+from app.services.zone_snapshots import get_zone_snapshot, ZoneSnapshot, TruckSnapshot
 
 router = APIRouter(prefix="/track", tags=["Tracking"])
 
@@ -49,46 +53,61 @@ def find_nearby_trucks(
     - Finding which zone covers a location
     - Discovery before registration
     """
-    # Get all active trucks with location
-    trucks = db.query(Truck).filter(
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km * 1000)
+    
+    # Active trucks inside the search box (plus any with a buffered,
+    # not-yet-flushed position), with their zone name in the same query
+    rows = db.query(Truck, Zone.name).outerjoin(
+        Zone, Zone.id == Truck.zone_id
+    ).filter(
         Truck.is_active == True,
-        Truck.last_lat.isnot(None),
-        Truck.last_lng.isnot(None)
+        or_(
+            and_(Truck.last_lat.between(min_lat, max_lat),
+                 Truck.last_lng.between(min_lng, max_lng)),
+            Truck.id.in_(pending_truck_ids())
+        )
     ).all()
     
     nearby = []
+    now = datetime.utcnow()
+    distance_to = haversine_from(lat, lng)
     
-    for truck in trucks:
-        distance_meters = haversine_distance(
-            lat, lng,
-            truck.last_lat, truck.last_lng
-        )
+    for truck, zone_name in rows:
+        overlay_pending_position(truck)
+        if truck.last_lat is None or truck.last_lng is None:
+            continue
+        
+        # Buffered positions weren't filtered by SQL
+        if not (min_lat <= truck.last_lat <= max_lat and
+                min_lng <= truck.last_lng <= max_lng):
+            continue
+        
+        distance_meters = distance_to(truck.last_lat, truck.last_lng)
         distance_km = distance_meters / 1000
         
         if distance_km <= radius_km:
-            zone = db.query(Zone).filter(Zone.id == truck.zone_id).first()
-            
             nearby.append({
                 "truck_id": truck.id,
                 "vehicle_number": truck.vehicle_number,
                 "zone_id": truck.zone_id,
-                "zone_name": zone.name if zone else None,
+                "zone_name": zone_name,
                 "distance_km": round(distance_km, 2),
                 "distance_text": format_distance(distance_meters),
                 "lat": truck.last_lat,
                 "lng": truck.last_lng,
-                "last_update_seconds_ago": format_time_ago(truck.last_update)
+                "last_update_seconds_ago": format_time_ago(truck.last_update, now)
             })
     
     # Sort by distance
     nearby.sort(key=lambda x: x["distance_km"])
     
-    return {
+    # Plain JSON types only - encode directly (no jsonable_encoder walk)
+    return ORJSONResponse({
         "search_location": {"lat": lat, "lng": lng},
         "radius_km": radius_km,
         "found": len(nearby),
         "trucks": nearby
-    }
+    })
 
 
 @router.get("/zone/{zone_id}")
@@ -101,7 +120,7 @@ def get_zone_truck_status(
     
     Public endpoint - can be called without user login.
     """
-    zone = db.query(Zone).filter(Zone.id == zone_id).first()
+    zone = db.get(Zone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
@@ -115,6 +134,8 @@ def get_zone_truck_status(
             "truck": None
         }
     
+    overlay_pending_position(truck)
+    
     return {
         "zone_id": zone.id,
         "zone_name": zone.name,
@@ -153,7 +174,7 @@ def track_truck(
     Poll this every 3-5 seconds for live tracking.
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -167,22 +188,45 @@ def track_truck(
             detail="Your location is not in any service zone. Please update your home location."
         )
     
-    # Get zone
-    zone = db.query(Zone).filter(Zone.id == user.zone_id).first()
-    if not zone:
+    # Get zone and its truck (cached for a couple of seconds, shared
+    # by every user polling this zone)
+    snapshot = get_zone_snapshot(db, user.zone_id)
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Zone not found")
+    zone, truck = snapshot
     
+    # Main per-poll payload: dump straight from the model (no
+    # response_model re-validation + jsonable_encoder pass)
+    tracking = build_tracking_response(db, user, zone, truck)
+    return Response(tracking.model_dump_json(), media_type="application/json")
+
+
+def build_tracking_response(
+    db: Session,
+    user: User,
+    zone: ZoneSnapshot,
+    truck: Optional[TruckSnapshot]
+) -> TrackingResponse:
+    """
+    Build the tracking screen payload for a user.
+    
+    Args:
+        db: Database session
+        user: User polling
+        zone: User's zone
+        truck: Zone's truck, or None
+    
+    Returns:
+        TrackingResponse
+    """
     # Build zone info
     zone_info = ZoneInfo(
         id=zone.id,
         name=zone.name,
-        typical_start=zone.typical_start_time.strftime("%I:%M %p") if zone.typical_start_time else None,
-        typical_end=zone.typical_end_time.strftime("%I:%M %p") if zone.typical_end_time else None
+        typical_start=format_time(zone.typical_start_time),
+        typical_end=format_time(zone.typical_end_time)
     )
     
-    # Get truck for zone
-    truck = db.query(Truck).filter(Truck.zone_id == user.zone_id).first()
-    
     # No truck assigned
     if not truck:
         return TrackingResponse(
@@ -224,9 +268,9 @@ def track_truck(
     if not truck.is_active:
         message = "Truck is not on duty."
         if zone.typical_start_time:
-            message += f" Usual timing: {zone.typical_start_time.strftime('%I:%M %p')}"
+            message += f" Usual timing: {format_time(zone.typical_start_time)}"
             if zone.typical_end_time:
-                message += f" - {zone.typical_end_time.strftime('%I:%M %p')}"
+                message += f" - {format_time(zone.typical_end_time)}"
         
         return TrackingResponse(
             truck=truck_info,
@@ -292,7 +336,9 @@ def track_truck(
     )
     
     # Get alert info
-    alert_info_dict = get_alert_info_for_user(db, user, truck, distance_meters)
+    alert_info_dict = get_alert_info_for_user(
+        db, user, truck, distance_meters, status=status
+    )
     alert_info = None
     if alert_info_dict:
         alert_info = AlertInfo(
@@ -306,7 +352,7 @@ def track_truck(
         truck=truck_info,
         distance=distance_info,
         eta=eta_info,
-        status=TruckStatus(status),
+        status=status,
         zone=zone_info,
         duty=duty_info,
         alert=alert_info,
@@ -318,16 +364,17 @@ def track_truck(
 def get_truck_route(
     user_id: int,
     minutes: int = Query(60, ge=5, le=480, description="Minutes of history"),
+    simplify_m: float = Query(5, ge=0, le=100, description="Drop points within this many meters of the drawn line (0 = all points)"),
     db: Session = Depends(get_db)
 ):
     """
     Get truck's route history.
     
     Returns list of GPS points for drawing route on map.
-    Default: last 60 minutes.
+    Default: last 60 minutes, simplified to 5 m.
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -342,28 +389,42 @@ def get_truck_route(
     # Get locations
     time_threshold = datetime.utcnow() - timedelta(minutes=minutes)
     
-    locations = db.query(TruckLocation).filter(
-        TruckLocation.truck_id == truck.id,
-        TruckLocation.captured_at >= time_threshold
-    ).order_by(TruckLocation.captured_at).all()
-    
-    # Convert to route points
-    route = [
-        RoutePoint(
-            lat=loc.latitude,
-            lng=loc.longitude,
-            speed=loc.speed,
-            time=loc.captured_at.strftime("%H:%M:%S")
-        )
-        for loc in locations
-    ]
-    
-    from_time = locations[0].captured_at.strftime("%H:%M") if locations else None
-    to_time = locations[-1].captured_at.strftime("%H:%M") if locations else None
-    
-    return RouteResponse(
-        route=route,
-        total_points=len(route),
-        from_time=from_time,
-        to_time=to_time
-    )
\ No newline at end of file
+    # Only the columns we need (no ORM objects). All rows are loaded at
+    # once: simplifying the line needs every point anyway.
+    rows = db.execute(
+        select(
+            TruckLocation.latitude,
+            TruckLocation.longitude,
+            TruckLocation.speed,
+            TruckLocation.captured_at
+        ).where(
+            TruckLocation.truck_id == truck.id,
+            TruckLocation.captured_at >= time_threshold
+        ).order_by(TruckLocation.captured_at)
+    ).all()
+    
+    # Drop points that don't change the drawn line
+    keep = simplify_route([(lat, lng) for lat, lng, _, _ in rows], simplify_m)
+    
+    # Convert to route points (plain dicts, same shape as RoutePoint)
+    route = []
+    for i in keep:
+        lat, lng, speed, captured_at = rows[i]
+        route.append({
+            "lat": lat,
+            "lng": lng,
+            "speed": speed,
+            # Manual HH:MM:SS (much faster than strftime per point)
+            "time": f"{captured_at.hour:02d}:{captured_at.minute:02d}:{captured_at.second:02d}"
+        })
+    
+    from_time = route[0]["time"][:5] if route else None
+    to_time = route[-1]["time"][:5] if route else None
+    
+    # Already in RouteResponse shape - skip re-validating every point
+    return ORJSONResponse({
+        "route": route,
+        "total_points": len(route),
+        "from_time": from_time,
+        "to_time": to_time
+    })
\ No newline at end of file
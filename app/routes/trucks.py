@@ -9,6 +9,7 @@ Endpoints for:
 Endpoints:
     POST   /truck/               - Create truck (Admin)
     GET    /truck/all            - List trucks (Admin)
+    GET    /truck/all.ndjson     - Stream trucks as NDJSON (Admin)
     PUT    /truck/{id}           - Update truck (Admin)
     POST   /truck/{id}/assign-zone - Assign zone (Admin)
     
@@ -18,25 +19,174 @@ Endpoints:
     POST   /truck/{id}/location  - Send GPS location
     POST   /truck/{id}/sync      - Sync offline locations
     GET    /truck/{id}/status    - Get truck status
+    POST   /truck/bulk-status    - Get status of many trucks (Admin)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import io
+import time
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert, update, select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, date
 
-from app.database import get_db
-from app.models import Zone, Truck, TruckLocation, User
+from app.config import settings, is_sqlite
+from app.database import get_db, SessionLocal, unique_violation
+from app.models import Zone, Truck, TruckLocation
 from app.schemas import (
-    TruckCreate, TruckUpdate, TruckResponse,
+    TruckCreate, TruckUpdate, TruckResponse, TruckBulkStatusRequest,
     DriverLoginRequest, DriverLoginResponse, DutyResponse,
     LocationUpdate, LocationBatchSync, LocationSyncResponse
 )
 from app.services.location import format_duration
-from app.services.alerts import check_alerts_for_truck, send_alert, reset_zone_alerts
+from app.services.alerts import schedule_alert_check, reset_zone_alerts
+from app.services.truck_positions import (
+    location_insert, record_position, queue_location, overlay_pending_position,
+    get_latest_position
+)
+from app.services.zone_snapshots import invalidate_zone_snapshots
 
 router = APIRouter(prefix="/truck", tags=["Truck / Driver"])
 
+# Offline batches larger than this go through COPY (PostgreSQL only)
+COPY_THRESHOLD = 100
+
+_loc_columns = TruckLocation.__table__.c
+
+# /sync insert that reports which points were new (not skipped)
+sync_insert = location_insert.returning(_loc_columns.captured_at)
+
+# /truck/all: select just the response fields, then validate and encode
+# the whole list in one pydantic-core call
+truck_list_adapter = TypeAdapter(List[TruckResponse])
+truck_adapter = TypeAdapter(TruckResponse)
+_truck_response_columns = [getattr(Truck, field) for field in TruckResponse.model_fields]
+
+# Admin dashboards and driver apps poll /truck/all and /truck/{id}/status.
+# Rows / counts are reused for TRUCK_CACHE_TTL seconds (positions are
+# still applied fresh on every read).
+# active_only -> (loaded_at, response rows)
+_truck_list_cache: Dict[bool, Tuple[float, List[dict]]] = {}
+# truck_id -> (loaded_at, day, locations counted that day)
+_location_counts: Dict[int, Tuple[float, date, int]] = {}
+
+
+def invalidate_truck_caches():
+    """Drop cached truck data (zone snapshots too). Call after any truck change."""
+    invalidate_zone_snapshots()
+    _truck_list_cache.clear()
+    _location_counts.clear()
+
+
+def with_latest_position(truck: dict) -> dict:
+    """Apply the newest position recorded here to a truck row dict."""
+    latest = get_latest_position(truck["id"])
+    if latest is not None and (
+        truck["last_update"] is None or latest.updated_at > truck["last_update"]
+    ):
+        truck.update(
+            last_lat=latest.lat,
+            last_lng=latest.lng,
+            last_speed=latest.speed,
+            last_heading=latest.heading,
+            last_update=latest.updated_at
+        )
+    return truck
+
+
+def count_locations_today(db: Session, truck_id: int) -> int:
+    """Number of history rows a truck has captured today (cached briefly)."""
+    today = date.today()
+    cached = _location_counts.get(truck_id)
+    if (cached is not None and cached[1] == today and
+            time.monotonic() - cached[0] <= settings.TRUCK_CACHE_TTL):
+        return cached[2]
+    
+    # Plain COUNT(*) (Query.count() wraps the SELECT in a subquery);
+    # answered from the (truck_id, captured_at) primary key index
+    count = db.scalar(
+        select(func.count())
+        .select_from(TruckLocation)
+        .where(
+            TruckLocation.truck_id == truck_id,
+            TruckLocation.captured_at >= datetime.combine(today, datetime.min.time())
+        )
+    )
+    _location_counts[truck_id] = (time.monotonic(), today, count)
+    return count
+
+
+def activate_truck(db: Session, truck_id: int, started_at: datetime) -> bool:
+    """
+    Put a truck on duty if it isn't already.
+    
+    Done as one conditional UPDATE (not read-then-write), so concurrent
+    requests for the same truck can't both start the duty and overwrite
+    each other's duty_started_at.
+    
+    Returns:
+        True if this call activated the truck
+    """
+    result = db.execute(
+        update(Truck)
+        .where(Truck.id == truck_id, Truck.is_active == False)
+        .values(is_active=True, duty_started_at=started_at)
+    )
+    return result.rowcount == 1
+
+
+def copy_locations(db: Session, rows: List[dict]) -> int:
+    """
+    Bulk-load synced locations with PostgreSQL COPY.
+    
+    COPY can't skip duplicates, so rows go into a temp table first and
+    are then merged with ON CONFLICT DO NOTHING (re-sent points are
+    skipped, same as location_insert). Runs in the session's transaction.
+    
+    Returns:
+        Number of rows inserted (skipped ones not counted)
+    """
+    def scaled(column, value):
+        value = column.type.process_bind_param(value, None)
+        return r"\N" if value is None else str(value)
+    
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join((
+            str(row["truck_id"]), repr(row["latitude"]), repr(row["longitude"]),
+            scaled(_loc_columns.speed, row["speed"]),
+            scaled(_loc_columns.heading, row["heading"]),
+            scaled(_loc_columns.accuracy, row["accuracy"]),
+            row["captured_at"].isoformat(),
+            "t"
+        )) + "\n")
+    buf.seek(0)
+    
+    columns = ("truck_id, latitude, longitude, speed, heading, accuracy, "
+               "captured_at, is_offline_sync")
+    cursor = db.connection().connection.cursor()
+    try:
+        # timestamptz: aware timestamps are converted like a normal bind
+        cursor.execute(
+            "CREATE TEMP TABLE _sync_locations ("
+            "truck_id INTEGER, latitude FLOAT8, longitude FLOAT8, "
+            "speed SMALLINT, heading SMALLINT, accuracy SMALLINT, "
+            "captured_at TIMESTAMPTZ, is_offline_sync BOOLEAN"
+            ") ON COMMIT DROP"
+        )
+        cursor.copy_expert(f"COPY _sync_locations ({columns}) FROM STDIN", buf)
+        cursor.execute(
+            f"INSERT INTO truck_locations ({columns}) "
+            f"SELECT {columns} FROM _sync_locations "
+            f"ON CONFLICT DO NOTHING"
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
 
 # ============ ADMIN ENDPOINTS ============
 
@@ -48,29 +198,9 @@ def create_truck(
     """
     Create a new truck. (Admin)
     """
-    # Check vehicle number uniqueness
-    existing = db.query(Truck).filter(
-        Truck.vehicle_number == truck.vehicle_number
-    ).first()
-    if existing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Vehicle number '{truck.vehicle_number}' already exists"
-        )
-    
-    # Check phone uniqueness
-    existing_phone = db.query(Truck).filter(
-        Truck.driver_phone == truck.driver_phone
-    ).first()
-    if existing_phone:
-        raise HTTPException(
-            status_code=400,
-            detail="Driver phone number already registered"
-        )
-    
     # Check zone exists and not already assigned
     if truck.zone_id:
-        zone = db.query(Zone).filter(Zone.id == truck.zone_id).first()
+        zone = db.get(Zone, truck.zone_id)
         if not zone:
             raise HTTPException(status_code=404, detail="Zone not found")
         
@@ -83,19 +213,39 @@ def create_truck(
                 detail=f"Zone already has truck: {existing_truck.vehicle_number}"
             )
     
-    db_truck = Truck(
-        vehicle_number=truck.vehicle_number,
-        name=truck.name,
-        driver_name=truck.driver_name,
-        driver_phone=truck.driver_phone,
-        zone_id=truck.zone_id
-    )
-    
-    db.add(db_truck)
-    db.commit()
-    db.refresh(db_truck)
+    # INSERT ... RETURNING gives back the full row, so there's no
+    # refresh SELECT. Vehicle number / phone uniqueness is enforced
+    # by the unique indexes.
+    try:
+        db_truck = db.scalar(
+            insert(Truck).values(
+                vehicle_number=truck.vehicle_number,
+                name=truck.name,
+                driver_name=truck.driver_name,
+                driver_phone=truck.driver_phone,
+                zone_id=truck.zone_id
+            ).returning(Truck)
+        )
+        # Built before commit() expires the row (which would reload it)
+        response = TruckResponse.model_validate(db_truck)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("vehicle_number", "driver_phone"))
+        if column == "vehicle_number":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Vehicle number '{truck.vehicle_number}' already exists"
+            )
+        if column == "driver_phone":
+            raise HTTPException(
+                status_code=400,
+                detail="Driver phone number already registered"
+            )
+        raise
+    invalidate_truck_caches()
     
-    return db_truck
+    return response
 
 
 @router.get("/all", response_model=List[TruckResponse])
@@ -106,12 +256,50 @@ def list_trucks(
     """
     List all trucks. (Admin)
     """
-    query = db.query(Truck)
+    cached = _truck_list_cache.get(active_only)
+    if cached is None or time.monotonic() - cached[0] > settings.TRUCK_CACHE_TTL:
+        query = select(*_truck_response_columns)
+        
+        if active_only:
+            query = query.where(Truck.is_active == True)
+        
+        rows = [dict(row) for row in db.execute(query.order_by(Truck.id)).mappings()]
+        cached = (time.monotonic(), rows)
+        _truck_list_cache[active_only] = cached
     
+    trucks = [with_latest_position(dict(row)) for row in cached[1]]
+    
+    return Response(
+        truck_list_adapter.dump_json(truck_list_adapter.validate_python(trucks)),
+        media_type="application/json"
+    )
+
+
+@router.get("/all.ndjson", response_class=StreamingResponse)
+def stream_trucks(active_only: bool = False):
+    """
+    List all trucks as NDJSON, one truck per line. (Admin)
+    
+    Same fields as /truck/all, but rows are streamed from the DB and
+    encoded one at a time, so memory stays flat for large fleets and
+    clients can render as lines arrive.
+    """
+    query = select(*_truck_response_columns).order_by(Truck.id)
     if active_only:
-        query = query.filter(Truck.is_active == True)
+        query = query.where(Truck.is_active == True)
     
-    return query.order_by(Truck.id).all()
+    def generate():
+        # Own session: the stream outlives the request's dependencies
+        db = SessionLocal()
+        try:
+            rows = db.execute(query.execution_options(yield_per=200)).mappings()
+            for row in rows:
+                truck = truck_adapter.validate_python(with_latest_position(dict(row)))
+                yield truck_adapter.dump_json(truck) + b"\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.put("/{truck_id}", response_model=TruckResponse)
@@ -123,29 +311,28 @@ def update_truck(
     """
     Update truck details. (Admin)
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
+    truck = db.get(Truck, truck_id)
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    # Check phone uniqueness if changing
-    if truck_data.driver_phone and truck_data.driver_phone != truck.driver_phone:
-        existing = db.query(Truck).filter(
-            Truck.driver_phone == truck_data.driver_phone,
-            Truck.id != truck_id
-        ).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail="Phone number already registered to another truck"
-            )
-    
     # Update fields
     update_data = truck_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(truck, field, value)
     
-    db.commit()
+    # Phone uniqueness is enforced by the unique index
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, ("driver_phone",)):
+            raise HTTPException(
+                status_code=400,
+                detail="Phone number already registered to another truck"
+            )
+        raise
     db.refresh(truck)
+    invalidate_truck_caches()
     
     return truck
 
@@ -159,11 +346,11 @@ def assign_zone(
     """
     Assign truck to a zone. (Admin)
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
+    truck = db.get(Truck, truck_id)
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    zone = db.query(Zone).filter(Zone.id == zone_id).first()
+    zone = db.get(Zone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
@@ -180,6 +367,7 @@ def assign_zone(
     
     truck.zone_id = zone_id
     db.commit()
+    invalidate_truck_caches()
     
     return {
         "message": f"Truck assigned to zone '{zone.name}'",
@@ -200,20 +388,19 @@ def driver_login(
     
     Returns truck info and assigned zone.
     """
-    truck = db.query(Truck).filter(
+    # Truck and its zone name in one query
+    row = db.query(Truck, Zone.name).outerjoin(
+        Zone, Zone.id == Truck.zone_id
+    ).filter(
         Truck.driver_phone == request.phone
     ).first()
     
-    if not truck:
+    if not row:
         raise HTTPException(
             status_code=404,
             detail="No truck registered with this phone number"
         )
-    
-    zone_name = None
-    if truck.zone_id:
-        zone = db.query(Zone).filter(Zone.id == truck.zone_id).first()
-        zone_name = zone.name if zone else None
+    truck, zone_name = row
     
     return DriverLoginResponse(
         truck_id=truck.id,
@@ -235,7 +422,7 @@ def start_duty(
     
     Activates tracking and resets alerts for zone users.
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
+    truck = db.get(Truck, truck_id)
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
@@ -246,14 +433,21 @@ def start_duty(
             started_at=truck.duty_started_at
         )
     
-    truck.is_active = True
-    truck.duty_started_at = datetime.utcnow()
+    if not activate_truck(db, truck_id, datetime.utcnow()):
+        # Started by a concurrent request
+        db.refresh(truck)
+        return DutyResponse(
+            status="active",
+            message="Already on duty",
+            started_at=truck.duty_started_at
+        )
     
     # Reset alerts for all users in this zone
     if truck.zone_id:
         reset_zone_alerts(db, truck.zone_id)
     
     db.commit()
+    invalidate_truck_caches()
     
     return DutyResponse(
         status="active",
@@ -272,7 +466,7 @@ def stop_duty(
     
     Deactivates tracking.
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
+    truck = db.get(Truck, truck_id)
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
@@ -286,6 +480,7 @@ def stop_duty(
     
     truck.is_active = False
     db.commit()
+    invalidate_truck_caches()
     
     return DutyResponse(
         status="inactive",
@@ -294,11 +489,10 @@ def stop_duty(
     )
 
 
-@router.post("/{truck_id}/location")
-async def update_location(
+@router.post("/{truck_id}/location", status_code=202)
+def update_location(
     truck_id: int,
     location: LocationUpdate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -306,63 +500,46 @@ async def update_location(
     
     Called every 5-30 seconds by driver app.
     Also triggers alert checks for nearby users.
+    
+    Answers 202: the point is buffered and written by the background
+    flusher (503 if the buffer is full; the app should retry or /sync).
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
+    truck = db.get(Truck, truck_id)
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    # Auto-activate if not active
-    if not truck.is_active:
-        truck.is_active = True
-        truck.duty_started_at = datetime.utcnow()
-    
-    # Update cached location
-    truck.last_lat = location.lat
-    truck.last_lng = location.lng
-    truck.last_speed = location.speed
-    truck.last_heading = location.heading
-    truck.last_update = datetime.utcnow()
-    
-    # Save to history
-    db_location = TruckLocation(
-        truck_id=truck_id,
-        latitude=location.lat,
-        longitude=location.lng,
-        speed=location.speed,
-        heading=location.heading,
-        accuracy=location.accuracy,
-        captured_at=location.captured_at,
-        is_offline_sync=False
+    # One server timestamp for the whole update
+    now = datetime.utcnow()
+    
+    # Save to history and update cached location (both buffered and
+    # written in one batch by the background flusher)
+    queued = queue_location({
+        "truck_id": truck_id,
+        "latitude": location.lat,
+        "longitude": location.lng,
+        "speed": location.speed,
+        "heading": location.heading,
+        "accuracy": location.accuracy,
+        "captured_at": location.captured_at,
+        "is_offline_sync": False
+    })
+    if not queued:
+        raise HTTPException(status_code=503, detail="Location buffer full, retry later")
+    record_position(
+        truck_id, location.lat, location.lng,
+        location.speed, location.heading, now
     )
-    db.add(db_location)
-    db.commit()
     
-    # Check alerts in background (don't slow down response)
-    background_tasks.add_task(process_alerts, truck_id, db)
+    # Auto-activate if not active
+    activated = not truck.is_active and activate_truck(db, truck_id, now)
+    if activated:
+        db.commit()
+        invalidate_truck_caches()
     
-    return {"ok": True, "timestamp": datetime.utcnow().isoformat()}
-
-
-async def process_alerts(truck_id: int, db: Session):
-    """
-    Background task to check and send alerts.
-    """
-    try:
-        truck = db.query(Truck).filter(Truck.id == truck_id).first()
-        if not truck:
-            return
-        
-        alerts = check_alerts_for_truck(db, truck)
-        
-        for alert_info in alerts:
-            user = db.query(User).filter(User.id == alert_info["user_id"]).first()
-            if user:
-                await send_alert(db, alert_info, user)
-                
-    except Exception as e:
-        # Log error but don't crash
-        import logging
-        logging.error(f"Error processing alerts: {e}")
+    # Check alerts in the alert worker (don't slow down response)
+    schedule_alert_check(truck_id)
+    
+    return {"ok": True, "timestamp": now.isoformat()}
 
 
 @router.post("/{truck_id}/sync", response_model=LocationSyncResponse)
@@ -376,56 +553,79 @@ def sync_offline_locations(
     
     Called when driver app comes back online after being offline.
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
+    truck = db.get(Truck, truck_id)
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    synced = 0
     failed = 0
     
-    # Sort by captured time
-    sorted_locations = sorted(request.locations, key=lambda x: x.captured_at)
-    
-    for loc in sorted_locations:
-        try:
-            db_location = TruckLocation(
-                truck_id=truck_id,
-                latitude=loc.lat,
-                longitude=loc.lng,
-                speed=loc.speed,
-                heading=loc.heading,
-                accuracy=loc.accuracy,
-                captured_at=loc.captured_at,
-                is_offline_sync=True
-            )
-            db.add(db_location)
-            synced += 1
-        except Exception:
-            failed += 1
+    # Points arrive as validated dicts (LocationPoint); build the insert
+    # rows straight from them. Same timestamp = same row, keep the last
+    # one. No need to sort: rows are keyed by captured_at and /route
+    # reads them in order.
+    rows = list({
+        loc["captured_at"]: {
+            "truck_id": truck_id,
+            "latitude": loc["lat"],
+            "longitude": loc["lng"],
+            "speed": loc.get("speed", 0),
+            "heading": loc.get("heading", 0),
+            "accuracy": loc.get("accuracy"),
+            "captured_at": loc["captured_at"],
+            "is_offline_sync": True
+        }
+        for loc in request.locations
+    }.values())
+    
+    if not is_sqlite() and len(rows) > COPY_THRESHOLD:
+        # Large offline batch: one COPY instead of one INSERT per point
+        synced = copy_locations(db, rows)
+    else:
+        # One executemany; re-sent points are skipped by the DB, and
+        # RETURNING only yields the rows actually inserted
+        synced = len(db.execute(sync_insert, rows).all())
+    skipped = len(request.locations) - synced
     
     # Update truck's cached location with most recent
-    if sorted_locations:
-        last = sorted_locations[-1]
-        truck.last_lat = last.lat
-        truck.last_lng = last.lng
-        truck.last_speed = last.speed
-        truck.last_heading = last.heading
+    if rows:
+        last = max(rows, key=lambda row: row["captured_at"])
+        truck.last_lat = last["latitude"]
+        truck.last_lng = last["longitude"]
+        truck.last_speed = last["speed"]
+        truck.last_heading = last["heading"]
         truck.last_update = datetime.utcnow()
         
         # Auto-activate
         if not truck.is_active:
-            truck.is_active = True
-            truck.duty_started_at = datetime.utcnow()
+            activate_truck(db, truck_id, truck.last_update)
     
     db.commit()
+    invalidate_truck_caches()
     
     return LocationSyncResponse(
         synced=synced,
+        skipped=skipped,
         failed=failed,
-        message=f"Synced {synced} locations" + (f", {failed} failed" if failed else "")
+        message=f"Synced {synced} locations"
+                + (f", {skipped} skipped as duplicates" if skipped else "")
+                + (f", {failed} failed" if failed else "")
     )
 
 
+def truck_status(truck: Truck, zone_name: Optional[str], location_count: int) -> dict:
+    """Status fields shown in the driver app / admin map."""
+    return {
+        "truck_id": truck.id,
+        "vehicle_number": truck.vehicle_number,
+        "zone_name": zone_name,
+        "is_active": truck.is_active,
+        "duty_started_at": truck.duty_started_at,
+        "duration": format_duration(truck.duty_started_at) if truck.duty_started_at else None,
+        "last_update": truck.last_update,
+        "locations_today": location_count
+    }
+
+
 @router.get("/{truck_id}/status")
 def get_truck_status(
     truck_id: int,
@@ -434,30 +634,51 @@ def get_truck_status(
     """
     Get truck status (for driver app display).
     """
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
-    if not truck:
+    # Truck and its zone name in one query
+    row = db.query(Truck, Zone.name).outerjoin(
+        Zone, Zone.id == Truck.zone_id
+    ).filter(Truck.id == truck_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Truck not found")
+    truck, zone_name = row
+    overlay_pending_position(truck)
     
     # Count today's locations
-    today_start = datetime.combine(date.today(), datetime.min.time())
-    location_count = db.query(TruckLocation).filter(
-        TruckLocation.truck_id == truck_id,
-        TruckLocation.captured_at >= today_start
-    ).count()
+    location_count = count_locations_today(db, truck_id)
     
-    # Get zone info
-    zone_name = None
-    if truck.zone_id:
-        zone = db.query(Zone).filter(Zone.id == truck.zone_id).first()
-        zone_name = zone.name if zone else None
+    return truck_status(truck, zone_name, location_count)
+
+
+@router.post("/bulk-status")
+def get_bulk_truck_status(
+    request: TruckBulkStatusRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Get status of many trucks at once (Admin map).
     
-    return {
-        "truck_id": truck.id,
-        "vehicle_number": truck.vehicle_number,
-        "zone_name": zone_name,
-        "is_active": truck.is_active,
-        "duty_started_at": truck.duty_started_at,
-        "duration": format_duration(truck.duty_started_at) if truck.duty_started_at else None,
-        "last_update": truck.last_update,
-        "locations_today": location_count
-    }
\ No newline at end of file
+    Same fields as /truck/{id}/status, in two queries total instead of
+    one request per truck. Unknown IDs are skipped.
+    """
+    truck_ids = list(dict.fromkeys(request.ids))
+    
+    rows = db.query(Truck, Zone.name).outerjoin(
+        Zone, Zone.id == Truck.zone_id
+    ).filter(Truck.id.in_(truck_ids)).order_by(Truck.id).all()
+    
+    # Today's location counts for all of them in one GROUP BY
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    counts = dict(db.execute(
+        select(TruckLocation.truck_id, func.count())
+        .where(
+            TruckLocation.truck_id.in_(truck_ids),
+            TruckLocation.captured_at >= today_start
+        )
+        .group_by(TruckLocation.truck_id)
+    ).all())
+    
+    return [
+        truck_status(overlay_pending_position(truck), zone_name, counts.get(truck.id, 0))
+        for truck, zone_name in rows
+    ]
+
@@ -14,21 +14,23 @@ Endpoints:
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app.database import get_db, unique_violation
 from app.models import User, Zone
 from app.schemas import (
     UserRegister, UserResponse, UserLoginRequest, UserLoginResponse,
     UserSettingsUpdate, UserHomeUpdate, FCMTokenUpdate
 )
-from app.services.location import is_point_in_zone
+from app.services.zone_index import ZoneMatch, find_zone
 
 router = APIRouter(prefix="/user", tags=["User"])
 
 
-def find_zone_for_location(db: Session, lat: float, lng: float) -> Zone | None:
+def find_zone_for_location(db: Session, lat: float, lng: float) -> ZoneMatch | None:
     """
     Find which zone contains a given location.
     
@@ -37,19 +39,9 @@ def find_zone_for_location(db: Session, lat: float, lng: float) -> Zone | None:
         lat, lng: Coordinates to check
     
     Returns:
-        Zone if found, None otherwise
+        ZoneMatch (id, name) if found, None otherwise
     """
-    zones = db.query(Zone).filter(Zone.is_active == True).all()
-    
-    for zone in zones:
-        if is_point_in_zone(
-            lat, lng,
-            zone.min_lat, zone.max_lat,
-            zone.min_lng, zone.max_lng
-        ):
-            return zone
-    
-    return None
+    return find_zone(db, lat, lng)
 
 
 @router.post("/register", response_model=UserResponse, status_code=201)
@@ -62,46 +54,50 @@ def register_user(
     
     Automatically assigns zone based on home location.
     """
-    # Check if phone already registered
-    existing = db.query(User).filter(User.phone == user.phone).first()
-    if existing:
-        raise HTTPException(
-            status_code=400,
-            detail="Phone number already registered"
-        )
-    
     # Find zone for home location
     zone = find_zone_for_location(db, user.home_lat, user.home_lng)
     zone_id = zone.id if zone else None
     zone_name = zone.name if zone else None
     
-    # Create user
-    db_user = User(
-        name=user.name,
-        phone=user.phone,
-        home_lat=user.home_lat,
-        home_lng=user.home_lng,
-        home_address=user.home_address,
-        zone_id=zone_id
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return UserResponse(
-        id=db_user.id,
-        name=db_user.name,
-        phone=db_user.phone,
-        home_lat=db_user.home_lat,
-        home_lng=db_user.home_lng,
-        home_address=db_user.home_address,
-        zone_id=db_user.zone_id,
-        zone_name=zone_name,
-        alert_enabled=db_user.alert_enabled,
-        alert_distance=db_user.alert_distance,
-        alert_type=db_user.alert_type
-    )
+    # Create user. INSERT ... RETURNING gives back the full row (with
+    # defaults), so there's no refresh SELECT. Phone uniqueness is
+    # enforced by the unique index.
+    try:
+        db_user = db.scalar(
+            insert(User).values(
+                name=user.name,
+                phone=user.phone,
+                home_lat=user.home_lat,
+                home_lng=user.home_lng,
+                home_address=user.home_address,
+                zone_id=zone_id
+            ).returning(User)
+        )
+        # Built before commit() expires the row (which would reload it)
+        response = UserResponse(
+            id=db_user.id,
+            name=db_user.name,
+            phone=db_user.phone,
+            home_lat=db_user.home_lat,
+            home_lng=db_user.home_lng,
+            home_address=db_user.home_address,
+            zone_id=db_user.zone_id,
+            zone_name=zone_name,
+            alert_enabled=db_user.alert_enabled,
+            alert_distance=db_user.alert_distance,
+            alert_type=db_user.alert_type
+        )
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, ("phone",)):
+            raise HTTPException(
+                status_code=400,
+                detail="Phone number already registered"
+            )
+        raise
+    
+    return response
 
 
 @router.post("/login", response_model=UserLoginResponse)
@@ -114,13 +110,17 @@ def login_user(
     
     Returns user info and assigned zone.
     """
-    user = db.query(User).filter(User.phone == request.phone).first()
+    # User and their zone name in one query
+    row = db.query(User, Zone.name).outerjoin(
+        Zone, Zone.id == User.zone_id
+    ).filter(User.phone == request.phone).first()
     
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=404,
             detail="No user registered with this phone number"
         )
+    user, zone_name = row
     
     if not user.is_active:
         raise HTTPException(
@@ -128,11 +128,6 @@ def login_user(
             detail="Account is deactivated"
         )
     
-    zone_name = None
-    if user.zone_id:
-        zone = db.query(Zone).filter(Zone.id == user.zone_id).first()
-        zone_name = zone.name if zone else None
-    
     return UserLoginResponse(
         user_id=user.id,
         name=user.name,
@@ -152,15 +147,14 @@ def get_user(
     """
     Get user profile by ID.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    # User and their zone name in one query
+    row = db.query(User, Zone.name).outerjoin(
+        Zone, Zone.id == User.zone_id
+    ).filter(User.id == user_id).first()
     
-    if not user:
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    zone_name = None
-    if user.zone_id:
-        zone = db.query(Zone).filter(Zone.id == user.zone_id).first()
-        zone_name = zone.name if zone else None
+    user, zone_name = row
     
     return UserResponse(
         id=user.id,
@@ -190,7 +184,7 @@ def update_settings(
     - alert_distance: Distance threshold for alerts (meters)
     - alert_type: push / missed_call / both / sound
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -203,7 +197,7 @@ def update_settings(
         user.alert_distance = settings.alert_distance
     
     if settings.alert_type is not None:
-        user.alert_type = settings.alert_type.value
+        user.alert_type = settings.alert_type
     
     db.commit()
     
@@ -226,7 +220,7 @@ def update_home_location(
     
     Automatically re-assigns zone based on new location.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -268,7 +262,7 @@ def update_fcm_token(
     
     Should be called on every app start to keep token fresh.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
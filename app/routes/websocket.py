@@ -11,34 +11,46 @@ Usage:
     Connect to: ws://server/ws/track/{user_id}
     Messages (server → client):
         {
-            "type": "location_update" | "status_change" | "error" | "pong",
+            "type": "location_update" | "truck_tick" | "status_change" | "error" | "pong",
             "data": { ... },
             "timestamp": "2024-01-15T06:45:30Z"
         }
 
+    "location_update" carries the user's own distance/ETA/status and is
+    sent on connect, on "refresh" and when an alert is due. Every other
+    GPS update is a zone-wide "truck_tick" with only the truck position
+    ({"truck": {...}}); the app computes the distance itself.
+
     Messages (client → server):
         { "type": "ping" }       -> server replies with "pong"
         { "type": "refresh" }    -> server sends current state immediately
 """
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket
 from sqlalchemy.orm import Session
-from typing import Dict, Set
+from typing import Dict, List, Optional, Set, Tuple
 import asyncio
-import json
 import logging
-from datetime import datetime
+import orjson
+import time
+from datetime import date, datetime
 
+from app.config import settings
 from app.database import SessionLocal
-from app.models import User, Truck, Zone
+from app.models import User, Truck, AlertLog
 from app.services.location import (
     haversine_distance,
+    haversine_from,
+    bounding_box,
     format_distance,
     estimate_eta,
     format_time_ago,
+    format_time,
     determine_truck_status,
 )
 from app.services.alerts import get_alert_info_for_user
+from app.services.truck_positions import overlay_pending_position, get_latest_position
+from app.services.zone_snapshots import ZoneSnapshot, TruckSnapshot, get_zone_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +60,34 @@ router = APIRouter(tags=["WebSocket"])
 # ============ CONNECTION MANAGER ============
 
 
+def encode_message(message: dict) -> str:
+    """
+    Encode a message as a JSON text frame (orjson, compact).
+
+    Sent as text, same as send_json, so clients see no difference.
+    """
+    return orjson.dumps(message).decode()
+
+
+# (monotonic time, ISO string) of the last formatted timestamp
+_timestamp = (0.0, "")
+TIMESTAMP_RESOLUTION = 0.25  # seconds
+
+
+def _now_iso() -> str:
+    """
+    Current UTC time as an ISO string ("...Z") for message timestamps.
+
+    Re-formatted at most every TIMESTAMP_RESOLUTION seconds; messages
+    sent in between share the same string.
+    """
+    global _timestamp
+    now = time.monotonic()
+    if now - _timestamp[0] >= TIMESTAMP_RESOLUTION:
+        _timestamp = (now, datetime.utcnow().isoformat() + "Z")
+    return _timestamp[1]
+
+
 class ConnectionManager:
     """
     Manages WebSocket connections.
@@ -64,11 +104,32 @@ class ConnectionManager:
         self.user_zone: Dict[int, int] = {}
         # zone_id -> set[user_id]
         self.zone_users: Dict[int, Set[int]] = {}
-
-    async def connect(self, websocket: WebSocket, user_id: int, zone_id: int):
+        # zone_id -> set[user_id] of connected users with a home location
+        # (the only ones a broadcast can compute distance/alerts for)
+        self.home_users: Dict[int, Set[int]] = {}
+        # zone_id -> ((websocket, user_id), ...) flattened for broadcasts;
+        # dropped on connect/disconnect in the zone, rebuilt on next use
+        self.zone_sockets: Dict[int, Tuple[Tuple[WebSocket, int], ...]] = {}
+        # websocket -> outbound queue, drained by one writer task per socket
+        self.outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self.writers: Dict[WebSocket, asyncio.Task] = {}
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        zone_id: int,
+        has_home: bool = False
+    ):
         """Accept connection and register user."""
         await websocket.accept()
 
+        outbox = asyncio.Queue(maxsize=settings.WS_QUEUE_SIZE)
+        self.outboxes[websocket] = outbox
+        self.writers[websocket] = asyncio.create_task(
+            self._drain(websocket, user_id, outbox)
+        )
+
         self.user_zone[user_id] = zone_id
 
         if user_id not in self.user_connections:
@@ -78,13 +139,22 @@ class ConnectionManager:
         if zone_id not in self.zone_users:
             self.zone_users[zone_id] = set()
         self.zone_users[zone_id].add(user_id)
+        self.zone_sockets.pop(zone_id, None)
+        self.set_has_home(user_id, has_home)
 
         logger.info(f"[WS] User {user_id} connected (zone {zone_id})")
 
     def _remove_connection(self, websocket: WebSocket, user_id: int):
         """Internal helper to remove a connection and clean maps."""
+        # Stop its writer (unless the writer itself is removing it)
+        self.outboxes.pop(websocket, None)
+        writer = self.writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+
         # Remove websocket from user connections
         if user_id in self.user_connections:
+            self.zone_sockets.pop(self.user_zone.get(user_id), None)
             self.user_connections[user_id].discard(websocket)
             if not self.user_connections[user_id]:
                 # No more connections for this user
@@ -96,35 +166,109 @@ class ConnectionManager:
                     self.zone_users[zone_id].discard(user_id)
                     if not self.zone_users[zone_id]:
                         del self.zone_users[zone_id]
+                if zone_id is not None and zone_id in self.home_users:
+                    self.home_users[zone_id].discard(user_id)
+                    if not self.home_users[zone_id]:
+                        del self.home_users[zone_id]
+
+    def set_has_home(self, user_id: int, has_home: bool):
+        """Record whether a connected user has a home location set."""
+        zone_id = self.user_zone.get(user_id)
+        if zone_id is None:
+            return
+        if has_home:
+            self.home_users.setdefault(zone_id, set()).add(user_id)
+        elif zone_id in self.home_users:
+            self.home_users[zone_id].discard(user_id)
+            if not self.home_users[zone_id]:
+                del self.home_users[zone_id]
 
     def disconnect(self, websocket: WebSocket, user_id: int, zone_id: int | None = None):
         """Public disconnect method called on WebSocket close."""
         self._remove_connection(websocket, user_id)
         logger.info(f"[WS] User {user_id} disconnected")
 
-    async def send_to_user(self, user_id: int, message: dict):
-        """Send a message to all active connections of a user."""
-        if user_id not in self.user_connections:
-            return
-
-        dead_sockets = []
-
-        for ws in list(self.user_connections[user_id]):
+    async def _drain(self, websocket: WebSocket, user_id: int, outbox: asyncio.Queue):
+        """Writer task: send queued (already encoded) frames to one socket, in order."""
+        while True:
+            frame = await outbox.get()
             try:
-                await ws.send_json(message)
+                await asyncio.wait_for(
+                    websocket.send_text(frame), timeout=settings.WS_SEND_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"[WS] Send to user {user_id} timed out, disconnecting")
+                self._close(websocket, user_id, code=1013)
+                return
             except Exception as e:
-                logger.error(f"[WS] Error sending to user {user_id}: {e}")
-                dead_sockets.append(ws)
+                logger.error(f"[WS] Error sending to user {user_id}: {e!r}")
+                self._close(websocket, user_id, code=1011)
+                return
 
-        # Clean up dead connections
-        for ws in dead_sockets:
-            self._remove_connection(ws, user_id)
+    def _close(self, websocket: WebSocket, user_id: int, code: int):
+        """Drop a connection and close its socket in the background."""
+        self._remove_connection(websocket, user_id)
+        asyncio.create_task(self._close_socket(websocket, code))
+
+    @staticmethod
+    async def _close_socket(websocket: WebSocket, code: int):
+        """Close a socket, ignoring errors (it may already be gone)."""
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _enqueue(self, websocket: WebSocket, user_id: int, frame: str):
+        """
+        Queue an encoded frame for one socket (never waits on the network).
+
+        A client whose queue is full isn't keeping up; it's disconnected
+        so it can't hold unbounded memory (the app reconnects and gets
+        a fresh state).
+        """
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            return
+        try:
+            outbox.put_nowait(frame)
+        except asyncio.QueueFull:
+            logger.warning(f"[WS] User {user_id} too slow, disconnecting")
+            self._close(websocket, user_id, code=1013)
+
+    def send(self, websocket: WebSocket, user_id: int, message: dict):
+        """Queue a message for one socket."""
+        self._enqueue(websocket, user_id, encode_message(message))
+
+    def send_to_user(self, user_id: int, message: dict):
+        """Queue a message for all active connections of a user (encoded once)."""
+        sockets = tuple(self.user_connections.get(user_id, ()))
+        if not sockets:
+            return
+        frame = encode_message(message)
+        for ws in sockets:
+            self._enqueue(ws, user_id, frame)
 
     async def broadcast_to_zone(self, zone_id: int, message: dict):
-        """Broadcast a message to all users connected in a zone."""
-        user_ids = list(self.zone_users.get(zone_id, set()))
-        for user_id in user_ids:
-            await self.send_to_user(user_id, message)
+        """
+        Broadcast a message to all users connected in a zone.
+
+        Encoded once for everyone, then only queued; each socket's writer
+        sends it, so one slow client doesn't delay the rest.
+        """
+        sockets = self.zone_sockets.get(zone_id)
+        if sockets is None:
+            sockets = tuple(
+                (ws, user_id)
+                for user_id in self.zone_users.get(zone_id, ())
+                for ws in self.user_connections.get(user_id, ())
+            )
+            self.zone_sockets[zone_id] = sockets
+        if not sockets:
+            return
+
+        frame = encode_message(message)
+        for ws, user_id in sockets:
+            self._enqueue(ws, user_id, frame)
 
     def get_zone_user_count(self, zone_id: int) -> int:
         """Get number of connected users in a zone."""
@@ -137,6 +281,32 @@ manager = ConnectionManager()
 
 # ============ WEBSOCKET ENDPOINT ============
 
+def _get_user(user_id: int) -> Optional[User]:
+    """Load a user in its own short-lived session (run in a worker thread)."""
+    db: Session = SessionLocal()
+    try:
+        return db.get(User, user_id)
+    finally:
+        db.close()
+
+
+PONG_MESSAGE = {"type": "pong", "data": {}}
+
+
+async def _handle_ping(websocket: WebSocket, user_id: int):
+    manager.send(websocket, user_id, {**PONG_MESSAGE, "timestamp": _now_iso()})
+
+
+async def _handle_refresh(websocket: WebSocket, user_id: int):
+    await send_current_state(websocket, user_id)
+
+
+# client message "type" -> handler
+CLIENT_HANDLERS = {
+    "ping": _handle_ping,
+    "refresh": _handle_refresh,
+}
+
 
 @router.websocket("/ws/track/{user_id}")
 async def websocket_tracking(websocket: WebSocket, user_id: int):
@@ -153,23 +323,21 @@ async def websocket_tracking(websocket: WebSocket, user_id: int):
             - "refresh"  -> full state push
     """
     # First DB check: verify user & zone
-    db: Session = SessionLocal()
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            await websocket.close(code=4004, reason="User not found")
-            return
+    user = await asyncio.to_thread(_get_user, user_id)
+    if not user:
+        await websocket.close(code=4004, reason="User not found")
+        return
 
-        if not user.zone_id:
-            await websocket.close(code=4003, reason="No zone assigned to user")
-            return
+    if not user.zone_id:
+        await websocket.close(code=4003, reason="No zone assigned to user")
+        return
 
-        zone_id = user.zone_id
-    finally:
-        db.close()
+    zone_id = user.zone_id
 
     # Register connection
-    await manager.connect(websocket, user_id, zone_id)
+    await manager.connect(
+        websocket, user_id, zone_id, has_home=user.home_lat is not None
+    )
 
     # Send initial state
     await send_current_state(websocket, user_id)
@@ -178,35 +346,33 @@ async def websocket_tracking(websocket: WebSocket, user_id: int):
         # Main receive loop
         while True:
             try:
-                raw_data = await websocket.receive_text()
-            except WebSocketDisconnect:
-                break
+                frame = await websocket.receive()
             except Exception as e:
                 logger.error(f"[WS] receive error for user {user_id}: {e}")
                 break
+            if frame["type"] == "websocket.disconnect":
+                break
+
+            # Text or binary frame; orjson parses either without decoding first
+            raw_data = frame.get("text")
+            if raw_data is None:
+                raw_data = frame.get("bytes") or b""
 
             # Parse client message
             try:
-                message = json.loads(raw_data)
-            except json.JSONDecodeError:
+                message = orjson.loads(raw_data)
+            except orjson.JSONDecodeError:
                 # Ignore malformed client messages
                 continue
 
-            msg_type = message.get("type")
-
-            if msg_type == "ping":
-                await websocket.send_json(
-                    {
-                        "type": "pong",
-                        "data": {},
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                    }
-                )
-            elif msg_type == "refresh":
-                await send_current_state(websocket, user_id)
-            else:
-                # Unknown command -> ignore (safe default)
-                continue
+            # Unknown command -> ignore (safe default)
+            handler = (
+                CLIENT_HANDLERS.get(message.get("type"))
+                if isinstance(message, dict)
+                else None
+            )
+            if handler is not None:
+                await handler(websocket, user_id)
 
     finally:
         manager.disconnect(websocket, user_id, zone_id)
@@ -219,290 +385,406 @@ async def send_current_state(websocket: WebSocket, user_id: int):
     """
     Build and send current tracking state to a specific WebSocket.
 
+    The DB work runs in a worker thread so other sockets aren't blocked
+    while it waits on the database.
+    """
+    message, has_home = await asyncio.to_thread(build_current_state, user_id)
+    # Picks up a home location set since the user connected
+    manager.set_has_home(user_id, has_home)
+    manager.send(websocket, user_id, message)
+
+
+def build_current_state(user_id: int) -> Tuple[dict, bool]:
+    """
+    Build the current tracking state message for a user.
+
     This roughly mirrors the /track/{user_id} logic but lighter,
     optimized for WebSocket payloads.
+
+    Returns:
+        (message, whether the user has a home location)
     """
+    has_home = False
     db: Session = SessionLocal()
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
-            await websocket.send_json(
-                {
-                    "type": "error",
-                    "data": {"message": "User not found"},
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+            return {
+                "type": "error",
+                "data": {"message": "User not found"},
+                "timestamp": _now_iso(),
+            }, has_home
+
+        has_home = user.home_lat is not None and user.home_lng is not None
 
         if not user.zone_id:
-            await websocket.send_json(
-                {
-                    "type": "status_change",
-                    "data": {
-                        "status": "no_zone",
-                        "message": "No service zone assigned. Please set your home location.",
-                    },
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+            return {
+                "type": "status_change",
+                "data": {
+                    "status": "no_zone",
+                    "message": "No service zone assigned. Please set your home location.",
+                },
+                "timestamp": _now_iso(),
+            }, has_home
+
+        snapshot = get_zone_snapshot(db, user.zone_id)
+        if snapshot is None:
+            return {
+                "type": "error",
+                "data": {"message": "Zone not found"},
+                "timestamp": _now_iso(),
+            }, has_home
+
+        zone, truck = snapshot
+        if truck is None:
+            return {
+                "type": "status_change",
+                "data": {
+                    "status": "no_truck",
+                    "zone_id": zone.id,
+                    "zone_name": zone.name,
+                    "message": "No truck assigned to your zone yet.",
+                },
+                "timestamp": _now_iso(),
+            }, has_home
 
-        zone = db.query(Zone).filter(Zone.id == user.zone_id).first()
-        if not zone:
-            await websocket.send_json(
-                {
-                    "type": "error",
-                    "data": {"message": "Zone not found"},
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+        return _build_truck_state(db, user, zone, truck), has_home
 
-        truck = db.query(Truck).filter(Truck.zone_id == user.zone_id).first()
-        if not truck:
-            await websocket.send_json(
-                {
-                    "type": "status_change",
-                    "data": {
-                        "status": "no_truck",
-                        "zone_id": zone.id,
-                        "zone_name": zone.name,
-                        "message": "No truck assigned to your zone yet.",
-                    },
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+    except Exception as e:
+        logger.error(f"[WS] send_current_state error for user {user_id}: {e}")
+        return {
+            "type": "error",
+            "data": {"message": "Internal server error"},
+            "timestamp": _now_iso(),
+        }, has_home
+    finally:
+        db.close()
 
-        # Base payload
-        data = {
-            "zone": {
-                "id": zone.id,
-                "name": zone.name,
-                "typical_start": zone.typical_start_time.strftime("%I:%M %p")
-                if zone.typical_start_time
-                else None,
-                "typical_end": zone.typical_end_time.strftime("%I:%M %p")
-                if zone.typical_end_time
-                else None,
-            },
-            "truck": {
-                "id": truck.id,
-                "vehicle_number": truck.vehicle_number,
-                "driver_name": truck.driver_name,
-                "is_active": truck.is_active,
-                "lat": truck.last_lat,
-                "lng": truck.last_lng,
-                "speed": truck.last_speed,
-                "heading": truck.last_heading,
-                "last_update": truck.last_update.isoformat() + "Z"
-                if truck.last_update
-                else None,
-                "last_update_seconds_ago": format_time_ago(truck.last_update)
-                if truck.last_update
-                else None,
-            },
-            "status": "offline" if not truck.is_active else "active",
-        }
 
-        # If truck not active -> send simple status
-        if not truck.is_active:
-            await websocket.send_json(
-                {
-                    "type": "status_change",
-                    "data": {
-                        **data,
-                        "message": "Truck is not on duty right now.",
-                    },
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+def _build_truck_state(
+    db: Session,
+    user: User,
+    zone: ZoneSnapshot,
+    truck: TruckSnapshot
+) -> dict:
+    """State message for a user whose zone has a truck."""
+    # Base payload
+    data = {
+        "zone": {
+            "id": zone.id,
+            "name": zone.name,
+            "typical_start": format_time(zone.typical_start_time),
+            "typical_end": format_time(zone.typical_end_time),
+        },
+        "truck": {
+            "id": truck.id,
+            "vehicle_number": truck.vehicle_number,
+            "driver_name": truck.driver_name,
+            "is_active": truck.is_active,
+            "lat": truck.last_lat,
+            "lng": truck.last_lng,
+            "speed": truck.last_speed,
+            "heading": truck.last_heading,
+            "last_update": truck.last_update.isoformat() + "Z"
+            if truck.last_update
+            else None,
+            "last_update_seconds_ago": format_time_ago(truck.last_update)
+            if truck.last_update
+            else None,
+        },
+        "status": "offline" if not truck.is_active else "active",
+    }
 
-        # If no latest GPS -> waiting state
-        if truck.last_lat is None or truck.last_lng is None:
-            data["status"] = "not_started"
-            data["message"] = "Truck started duty. Waiting for GPS signal..."
-            await websocket.send_json(
-                {
-                    "type": "location_update",
-                    "data": data,
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+    # If truck not active -> send simple status
+    if not truck.is_active:
+        return {
+            "type": "status_change",
+            "data": {
+                **data,
+                "message": "Truck is not on duty right now.",
+            },
+            "timestamp": _now_iso(),
+        }
 
-        # If user has no home location -> cannot compute distance/ETA
-        if user.home_lat is None or user.home_lng is None:
-            data["status"] = "approaching"
-            data["message"] = (
-                "Please set your home location to see distance and ETA."
-            )
-            await websocket.send_json(
-                {
-                    "type": "location_update",
-                    "data": data,
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-            return
+    # If no latest GPS -> waiting state
+    if truck.last_lat is None or truck.last_lng is None:
+        data["status"] = "not_started"
+        data["message"] = "Truck started duty. Waiting for GPS signal..."
+        return {
+            "type": "location_update",
+            "data": data,
+            "timestamp": _now_iso(),
+        }
 
-        # Compute distance & ETA
-        distance_meters = haversine_distance(
-            truck.last_lat, truck.last_lng, user.home_lat, user.home_lng
-        )
-        minutes, eta_text, arrival = estimate_eta(
-            distance_meters, truck.last_speed or 0
-        )
-        status = determine_truck_status(
-            distance_meters=distance_meters,
-            is_active=truck.is_active,
-            has_location=True,
+    # If user has no home location -> cannot compute distance/ETA
+    if user.home_lat is None or user.home_lng is None:
+        data["status"] = "approaching"
+        data["message"] = (
+            "Please set your home location to see distance and ETA."
         )
-
-        data["distance"] = {
-            "meters": int(distance_meters),
-            "text": format_distance(distance_meters),
-        }
-        data["eta"] = {
-            "minutes": minutes,
-            "text": eta_text,
-            "arrival_time": arrival,
+        return {
+            "type": "location_update",
+            "data": data,
+            "timestamp": _now_iso(),
         }
-        data["status"] = status
 
-        # Alert info (for UI & sound)
-        alert_info = get_alert_info_for_user(
-            db, user, truck, distance_meters
-        )
-        if alert_info:
-            data["alert"] = alert_info
-
-        await websocket.send_json(
-            {
-                "type": "location_update",
-                "data": data,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-            }
-        )
+    # Compute distance & ETA
+    distance_meters = haversine_distance(
+        truck.last_lat, truck.last_lng, user.home_lat, user.home_lng
+    )
+    minutes, eta_text, arrival = estimate_eta(
+        distance_meters, truck.last_speed or 0
+    )
+    status = determine_truck_status(
+        distance_meters=distance_meters,
+        is_active=truck.is_active,
+        has_location=True,
+    )
 
-    except WebSocketDisconnect:
-        # Let outer handler clean up
-        raise
-    except Exception as e:
-        logger.error(f"[WS] send_current_state error for user {user_id}: {e}")
-        try:
-            await websocket.send_json(
-                {
-                    "type": "error",
-                    "data": {"message": "Internal server error"},
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            )
-        except Exception:
-            pass
-    finally:
-        db.close()
+    data["distance"] = {
+        "meters": int(distance_meters),
+        "text": format_distance(distance_meters),
+    }
+    data["eta"] = {
+        "minutes": minutes,
+        "text": eta_text,
+        "arrival_time": arrival,
+    }
+    data["status"] = status
+
+    # Alert info (for UI & sound)
+    alert_info = get_alert_info_for_user(
+        db, user, truck, distance_meters, status=status
+    )
+    if alert_info:
+        data["alert"] = alert_info
+
+    return {
+        "type": "location_update",
+        "data": data,
+        "timestamp": _now_iso(),
+    }
 
 
 # ============ BROADCAST FUNCTIONS (to call from truck routes) ============
 
+# truck_id -> (zone_id, truck last_update, user ids) of the last location broadcast
+_last_broadcast: Dict[int, Tuple[int, datetime, Set[int]]] = {}
 
-async def broadcast_truck_location(truck_id: int, zone_id: int):
+# zone_id -> truck_id waiting to be broadcast, and the task that will send it
+_pending_broadcasts: Dict[int, int] = {}
+_broadcast_tasks: Dict[int, asyncio.Task] = {}
+
+
+def build_location_broadcast(
+    truck_id: int,
+    zone_id: int,
+    home_user_ids: List[int]
+) -> Tuple[Optional[dict], List[Tuple[int, dict]], Optional[datetime]]:
     """
-    Broadcast a truck's latest location to all connected users in its zone.
+    Build the messages for a truck location broadcast (DB work only,
+    nothing is sent; run in a worker thread).
 
-    Intended to be called from the truck location update route:
-        background_tasks.add_task(broadcast_truck_location, truck_id, zone_id)
+    Per-user messages are only considered for home_user_ids (connected
+    users with a home location); if there are none, the user and alert
+    queries are skipped.
+
+    Returns:
+        (zone-wide tick or None if there's nothing to send,
+         [(user_id, per-user message)], truck last_update)
     """
-    if manager.get_zone_user_count(zone_id) == 0:
-        # No listeners in this zone, skip DB work
-        return
+    tick = None
+    messages = []
+    last_update = None
 
     db: Session = SessionLocal()
     try:
-        truck = db.query(Truck).filter(Truck.id == truck_id).first()
+        truck = db.get(Truck, truck_id)
         if not truck:
-            return
+            return tick, messages, last_update
+        overlay_pending_position(truck)
+        last_update = truck.last_update
 
-        # Get all active users in this zone
+        # Connected active users of this zone, in one query
         users = db.query(User).filter(
-            User.zone_id == zone_id, User.is_active == True
-        ).all()
+            User.id.in_(home_user_ids),
+            User.zone_id == zone_id,
+            User.is_active == True
+        ).all() if home_user_ids and truck.is_active else []
+
+        truck_data = {
+            "id": truck.id,
+            "vehicle_number": truck.vehicle_number,
+            "is_active": truck.is_active,
+            "lat": truck.last_lat,
+            "lng": truck.last_lng,
+            "speed": truck.last_speed,
+            "heading": truck.last_heading,
+            "last_update": truck.last_update.isoformat() + "Z"
+            if truck.last_update
+            else None,
+        }
+
+        # Alerts this truck already sent today, for all of them in one query
+        sent_today: Dict[int, Set[str]] = {user.id: set() for user in users}
+        if truck.is_active and truck.last_lat is not None and users:
+            for alert_user_id, alert_type in db.query(
+                AlertLog.user_id, AlertLog.alert_type
+            ).filter(
+                AlertLog.user_id.in_(list(sent_today)),
+                AlertLog.truck_id == truck.id,
+                AlertLog.alert_date == date.today()
+            ):
+                sent_today[alert_user_id].add(alert_type)
+
+        timestamp = _now_iso()
 
+        # One frame for the whole zone; clients work out their own
+        # distance/ETA from the truck position
+        tick = {
+            "type": "truck_tick",
+            "data": {"truck": truck_data},
+            "timestamp": timestamp,
+        }
+
+        # Truck-side trig computed once for all users
+        distance_to = (
+            haversine_from(truck.last_lat, truck.last_lng)
+            if truck.is_active and truck.last_lat is not None
+            else None
+        )
+
+        # Homes farther than any alert can trigger (here/arriving, or the
+        # user's own approaching distance) are dropped by a box check
+        # before the trig
+        if distance_to is not None and users:
+            alert_range = max(
+                settings.ALERT_DISTANCE_HERE,
+                settings.ALERT_DISTANCE_ARRIVING,
+                max(user.alert_distance or 0 for user in users),
+            )
+            min_lat, max_lat, min_lng, max_lng = bounding_box(
+                truck.last_lat, truck.last_lng, alert_range
+            )
+
+        # Full per-user update only for users that are due an alert
         for user in users:
-            # Only send to users who are connected
-            if user.id not in manager.user_connections:
+            if distance_to is None or user.home_lat is None:
+                continue
+            if not (user.alert_enabled
+                    and min_lat <= user.home_lat <= max_lat
+                    and min_lng <= user.home_lng <= max_lng):
                 continue
 
-            data = {
-                "truck": {
-                    "id": truck.id,
-                    "vehicle_number": truck.vehicle_number,
-                    "is_active": truck.is_active,
-                    "lat": truck.last_lat,
-                    "lng": truck.last_lng,
-                    "speed": truck.last_speed,
-                    "heading": truck.last_heading,
-                    "last_update": truck.last_update.isoformat() + "Z"
-                    if truck.last_update
-                    else None,
-                }
-            }
-
-            if (
-                truck.is_active
-                and truck.last_lat is not None
-                and user.home_lat is not None
-            ):
-                distance = haversine_distance(
-                    truck.last_lat,
-                    truck.last_lng,
-                    user.home_lat,
-                    user.home_lng,
-                )
-                minutes, eta_text, arrival = estimate_eta(
-                    distance, truck.last_speed or 0
-                )
-                status = determine_truck_status(
-                    distance_meters=distance,
-                    is_active=truck.is_active,
-                    has_location=True,
-                )
-
-                data["distance"] = {
-                    "meters": int(distance),
-                    "text": format_distance(distance),
-                }
-                data["eta"] = {
-                    "minutes": minutes,
-                    "text": eta_text,
-                    "arrival_time": arrival,
-                }
-                data["status"] = status
-
-                # Alert info
-                alert_info = get_alert_info_for_user(
-                    db, user, truck, distance
-                )
-                if alert_info and alert_info.get("should_alert"):
-                    data["alert"] = alert_info
+            distance = distance_to(user.home_lat, user.home_lng)
+            status = determine_truck_status(
+                distance_meters=distance,
+                is_active=truck.is_active,
+                has_location=True,
+            )
+            alert_info = get_alert_info_for_user(
+                db, user, truck, distance, sent_today[user.id], status=status
+            )
+            if not (alert_info and alert_info.get("should_alert")):
+                continue
 
-            await manager.send_to_user(
+            minutes, eta_text, arrival = estimate_eta(
+                distance, truck.last_speed or 0
+            )
+            messages.append((
                 user.id,
                 {
                     "type": "location_update",
-                    "data": data,
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "data": {
+                        "truck": truck_data,
+                        "distance": {
+                            "meters": int(distance),
+                            "text": format_distance(distance),
+                        },
+                        "eta": {
+                            "minutes": minutes,
+                            "text": eta_text,
+                            "arrival_time": arrival,
+                        },
+                        "status": status,
+                        "alert": alert_info,
+                    },
+                    "timestamp": timestamp,
                 },
-            )
+            ))
 
     except Exception as e:
         logger.error(f"[WS] broadcast_truck_location error: {e}")
     finally:
         db.close()
 
+    return tick, messages, last_update
+
+
+async def broadcast_truck_location(truck_id: int, zone_id: int):
+    """
+    Broadcast a truck's latest location to all connected users in its zone.
+
+    Calls within WS_COALESCE_WINDOW seconds for the same zone are merged
+    into one broadcast of the newest position, so a truck sending GPS
+    faster than that costs one broadcast per window, not one per point.
+
+    Intended to be called from the truck location update route:
+        background_tasks.add_task(broadcast_truck_location, truck_id, zone_id)
+    """
+    _pending_broadcasts[zone_id] = truck_id
+    if zone_id not in _broadcast_tasks:
+        _broadcast_tasks[zone_id] = asyncio.create_task(_flush_zone_broadcast(zone_id))
+
+
+async def _flush_zone_broadcast(zone_id: int):
+    """Wait out the coalescing window, then send the zone's pending broadcast."""
+    try:
+        await asyncio.sleep(settings.WS_COALESCE_WINDOW)
+    finally:
+        # Anything arriving after this point schedules a new task
+        del _broadcast_tasks[zone_id]
+    truck_id = _pending_broadcasts.pop(zone_id, None)
+    if truck_id is not None:
+        await send_truck_location(truck_id, zone_id)
+
+
+async def send_truck_location(truck_id: int, zone_id: int):
+    """
+    Send a truck's latest location to the zone now (no coalescing).
+
+    Everyone gets the same "truck_tick" frame (built and encoded once);
+    users due an alert also get a full "location_update" with it.
+    """
+    # Only users connected right now
+    user_ids = list(manager.zone_users.get(zone_id, ()))
+    if not user_ids:
+        # No listeners in this zone, skip DB work
+        return
+
+    # Nothing new to tell anyone if the truck hasn't moved or changed
+    # state since the last broadcast (new connections get
+    # send_current_state anyway)
+    latest = get_latest_position(truck_id)
+    if latest is not None and _last_broadcast.get(truck_id) == (
+        zone_id, latest.updated_at, set(user_ids)
+    ):
+        return
+
+    home_user_ids = list(manager.home_users.get(zone_id, ()))
+    tick, messages, last_update = await asyncio.to_thread(
+        build_location_broadcast, truck_id, zone_id, home_user_ids
+    )
+
+    if tick is None:
+        return
+
+    _last_broadcast[truck_id] = (zone_id, last_update, set(user_ids))
+
+    await manager.broadcast_to_zone(zone_id, tick)
+    for user_id, message in messages:
+        manager.send_to_user(user_id, message)
+
 
 async def broadcast_truck_status_change(zone_id: int, is_active: bool):
     """
@@ -510,6 +792,11 @@ async def broadcast_truck_status_change(zone_id: int, is_active: bool):
 
     Intended to be called when driver presses START/STOP duty buttons.
     """
+    # The next location broadcast must go out even if the truck hasn't moved
+    for truck_id, (broadcast_zone_id, _, _) in list(_last_broadcast.items()):
+        if broadcast_zone_id == zone_id:
+            del _last_broadcast[truck_id]
+
     await manager.broadcast_to_zone(
         zone_id,
         {
@@ -520,7 +807,7 @@ async def broadcast_truck_status_change(zone_id: int, is_active: bool):
                 if is_active
                 else "Truck ended duty",
             },
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _now_iso(),
         },
     )
 
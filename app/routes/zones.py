@@ -13,18 +13,49 @@ Endpoints:
     GET    /zones/{id}/stats - Zone statistics
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 
 from app.database import get_db
-from app.models import Zone, Truck, User
+from app.models import Zone, Truck, TruckLocation, User
 from app.schemas import (
     ZoneCreate, ZoneUpdate, ZoneResponse, ZoneWithTruck
 )
+from app.services.zone_index import invalidate_zone_index
+from app.services.zone_snapshots import invalidate_zone_snapshots
 
 router = APIRouter(prefix="/zones", tags=["Zones (Admin)"])
 
+# Zones are built with model_construct (the values come straight from
+# the DB) and encoded in one pydantic-core call, not re-validated
+zone_list_adapter = TypeAdapter(List[ZoneWithTruck])
+zone_adapter = TypeAdapter(ZoneWithTruck)
+
+
+def zone_with_truck(zone: Zone) -> ZoneWithTruck:
+    """ZoneWithTruck for a loaded zone (zone.truck should be eager-loaded)."""
+    truck = zone.truck
+    return ZoneWithTruck.model_construct(
+        id=zone.id,
+        name=zone.name,
+        city=zone.city,
+        min_lat=zone.min_lat,
+        max_lat=zone.max_lat,
+        min_lng=zone.min_lng,
+        max_lng=zone.max_lng,
+        typical_start_time=zone.typical_start_time,
+        typical_end_time=zone.typical_end_time,
+        is_active=zone.is_active,
+        truck_id=truck.id if truck else None,
+        truck_vehicle_number=truck.vehicle_number if truck else None,
+        truck_is_active=truck.is_active if truck else None
+    )
+
 
 @router.post("/", response_model=ZoneResponse, status_code=201)
 def create_zone(
@@ -58,6 +89,8 @@ def create_zone(
     db.add(db_zone)
     db.commit()
     db.refresh(db_zone)
+    invalidate_zone_index()
+    invalidate_zone_snapshots()
     
     return db_zone
 
@@ -71,7 +104,8 @@ def list_zones(
     """
     List all zones with their truck information.
     """
-    query = db.query(Zone)
+    # Trucks for all zones in one extra IN query (not one per zone)
+    query = db.query(Zone).options(selectinload(Zone.truck))
     
     if active_only:
         query = query.filter(Zone.is_active == True)
@@ -81,27 +115,10 @@ def list_zones(
     
     zones = query.order_by(Zone.name).all()
     
-    # Build response with truck info
-    result = []
-    for zone in zones:
-        zone_data = ZoneWithTruck(
-            id=zone.id,
-            name=zone.name,
-            city=zone.city,
-            min_lat=zone.min_lat,
-            max_lat=zone.max_lat,
-            min_lng=zone.min_lng,
-            max_lng=zone.max_lng,
-            typical_start_time=zone.typical_start_time,
-            typical_end_time=zone.typical_end_time,
-            is_active=zone.is_active,
-            truck_id=zone.truck.id if zone.truck else None,
-            truck_vehicle_number=zone.truck.vehicle_number if zone.truck else None,
-            truck_is_active=zone.truck.is_active if zone.truck else None
-        )
-        result.append(zone_data)
-    
-    return result
+    return Response(
+        zone_list_adapter.dump_json([zone_with_truck(zone) for zone in zones]),
+        media_type="application/json"
+    )
 
 
 @router.get("/{zone_id}", response_model=ZoneWithTruck)
@@ -112,24 +129,13 @@ def get_zone(
     """
     Get zone details by ID.
     """
-    zone = db.query(Zone).filter(Zone.id == zone_id).first()
+    zone = db.get(Zone, zone_id, options=[joinedload(Zone.truck)])
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
-    return ZoneWithTruck(
-        id=zone.id,
-        name=zone.name,
-        city=zone.city,
-        min_lat=zone.min_lat,
-        max_lat=zone.max_lat,
-        min_lng=zone.min_lng,
-        max_lng=zone.max_lng,
-        typical_start_time=zone.typical_start_time,
-        typical_end_time=zone.typical_end_time,
-        is_active=zone.is_active,
-        truck_id=zone.truck.id if zone.truck else None,
-        truck_vehicle_number=zone.truck.vehicle_number if zone.truck else None,
-        truck_is_active=zone.truck.is_active if zone.truck else None
+    return Response(
+        zone_adapter.dump_json(zone_with_truck(zone)),
+        media_type="application/json"
     )
 
 
@@ -142,7 +148,7 @@ def update_zone(
     """
     Update zone details.
     """
-    zone = db.query(Zone).filter(Zone.id == zone_id).first()
+    zone = db.get(Zone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
@@ -153,6 +159,8 @@ def update_zone(
     
     db.commit()
     db.refresh(zone)
+    invalidate_zone_index()
+    invalidate_zone_snapshots()
     
     return zone
 
@@ -167,12 +175,14 @@ def delete_zone(
     
     Does not actually delete - just marks as inactive.
     """
-    zone = db.query(Zone).filter(Zone.id == zone_id).first()
+    zone = db.get(Zone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
     zone.is_active = False
     db.commit()
+    invalidate_zone_index()
+    invalidate_zone_snapshots()
     
     return {
         "message": f"Zone '{zone.name}' deactivated",
@@ -193,44 +203,56 @@ def get_zone_stats(
         - Truck info and status
         - Today's activity summary
     """
-    zone = db.query(Zone).filter(Zone.id == zone_id).first()
-    if not zone:
-        raise HTTPException(status_code=404, detail="Zone not found")
+    today_start = datetime.combine(date.today(), datetime.min.time())
     
-    # Count users
-    user_count = db.query(User).filter(
-        User.zone_id == zone_id,
-        User.is_active == True
-    ).count()
+    # Zone, truck and both counts in one round trip. The counts are
+    # scalar subqueries (joining users and locations would multiply rows);
+    # the location count is answered from the (truck_id, captured_at) PK.
+    user_count = (
+        select(func.count())
+        .select_from(User)
+        .where(User.zone_id == Zone.id, User.is_active == True)
+        .scalar_subquery()
+    )
+    location_count = (
+        select(func.count())
+        .select_from(TruckLocation)
+        .where(
+            TruckLocation.truck_id == Truck.id,
+            TruckLocation.captured_at >= today_start
+        )
+        .scalar_subquery()
+    )
+    row = db.execute(
+        select(
+            Zone.id, Zone.name, Zone.is_active,
+            Truck.id.label("truck_id"), Truck.vehicle_number, Truck.driver_name,
+            Truck.is_active.label("truck_is_active"), Truck.duty_started_at,
+            user_count.label("user_count"),
+            location_count.label("locations_today")
+        )
+        .outerjoin(Truck, Truck.zone_id == Zone.id)
+        .where(Zone.id == zone_id)
+    ).first()
     
-    # Get truck info
-    truck = db.query(Truck).filter(Truck.zone_id == zone_id).first()
-    truck_info = None
+    if not row:
+        raise HTTPException(status_code=404, detail="Zone not found")
     
-    if truck:
-        # Count today's locations
-        from datetime import date, datetime
-        today_start = datetime.combine(date.today(), datetime.min.time())
-        
-        from app.models import TruckLocation
-        location_count = db.query(TruckLocation).filter(
-            TruckLocation.truck_id == truck.id,
-            TruckLocation.captured_at >= today_start
-        ).count()
-        
+    truck_info = None
+    if row.truck_id is not None:
         truck_info = {
-            "id": truck.id,
-            "vehicle_number": truck.vehicle_number,
-            "driver_name": truck.driver_name,
-            "is_active": truck.is_active,
-            "duty_started_at": truck.duty_started_at,
-            "locations_today": location_count
+            "id": row.truck_id,
+            "vehicle_number": row.vehicle_number,
+            "driver_name": row.driver_name,
+            "is_active": row.truck_is_active,
+            "duty_started_at": row.duty_started_at,
+            "locations_today": row.locations_today
         }
     
     return {
-        "zone_id": zone.id,
-        "zone_name": zone.name,
-        "is_active": zone.is_active,
-        "user_count": user_count,
+        "zone_id": row.id,
+        "zone_name": row.name,
+        "is_active": row.is_active,
+        "user_count": row.user_count,
         "truck": truck_info
     }
\ No newline at end of file
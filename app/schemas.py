@@ -13,9 +13,12 @@ Organized by feature:
     - WebSocket schemas
 """
 
-from pydantic import BaseModel, Field, field_validator
+import re
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, model_validator
 from datetime import datetime, time, date
-from typing import Optional, List, Any
+from typing import Annotated, Optional, List, Any, Literal
+from typing_extensions import NotRequired, TypedDict
 from enum import Enum
 
 
@@ -40,6 +43,41 @@ class TruckStatus(str, Enum):
     NO_TRUCK = "no_truck"        # No truck assigned to zone
 
 
+# Same values as Literal types for schema fields: pydantic validates a
+# Literal with a plain string lookup instead of building the Enum member.
+# Enum members are accepted (they're str) and stored as plain strings.
+AlertTypeValue = Literal["push", "missed_call", "both", "sound"]
+TruckStatusValue = Literal[
+    "approaching", "arriving", "here", "passed",
+    "offline", "not_started", "no_truck"
+]
+
+
+# ============ VALIDATORS ============
+
+_phone_separators = re.compile(r"[\s\-().]")
+_phone_format = re.compile(r"\+?\d+")
+
+
+def normalize_phone(v: Any) -> Any:
+    """
+    Strip spaces, dashes, dots and brackets from a phone number and
+    check what's left is digits (with an optional leading +).
+    
+    Applied before storing and before lookups, so "98765 43210" and
+    "9876543210" are the same row for the unique index and logins.
+    """
+    if isinstance(v, str):
+        v = _phone_separators.sub("", v)
+        if not _phone_format.fullmatch(v):
+            raise ValueError("phone must contain only digits (and an optional leading +)")
+    return v
+
+
+# Phone number as sent by a client (normalized before length checks)
+Phone = Annotated[str, BeforeValidator(normalize_phone)]
+
+
 # ============ ZONE SCHEMAS ============
 
 class ZoneCreate(BaseModel):
@@ -54,19 +92,14 @@ class ZoneCreate(BaseModel):
     typical_start_time: Optional[time] = Field(None, description="Usual start time")
     typical_end_time: Optional[time] = Field(None, description="Usual end time")
     
-    @field_validator('max_lat')
-    @classmethod
-    def validate_lat_range(cls, v, info):
-        if 'min_lat' in info.data and v <= info.data['min_lat']:
+    @model_validator(mode='after')
+    def validate_ranges(self):
+        # One check on the built model instead of a validator per field
+        if self.max_lat <= self.min_lat:
             raise ValueError('max_lat must be greater than min_lat')
-        return v
-    
-    @field_validator('max_lng')
-    @classmethod
-    def validate_lng_range(cls, v, info):
-        if 'min_lng' in info.data and v <= info.data['min_lng']:
+        if self.max_lng <= self.min_lng:
             raise ValueError('max_lng must be greater than min_lng')
-        return v
+        return self
 
 
 class ZoneUpdate(BaseModel):
@@ -95,8 +128,8 @@ class ZoneResponse(BaseModel):
     typical_end_time: Optional[time]
     is_active: bool
     
-    class Config:
-        from_attributes = True
+    # Built from ORM rows; never changed after that
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class ZoneWithTruck(ZoneResponse):
@@ -115,8 +148,8 @@ class TruckCreate(BaseModel):
     name: Optional[str] = Field(None, max_length=100, 
                                 description="Friendly name like 'Truck 1'")
     driver_name: Optional[str] = Field(None, max_length=100)
-    driver_phone: str = Field(..., min_length=10, max_length=20,
-                              description="Driver's phone for login")
+    driver_phone: Phone = Field(..., min_length=10, max_length=20,
+                                description="Driver's phone for login")
     zone_id: Optional[int] = Field(None, description="Assigned zone ID")
 
 
@@ -124,7 +157,7 @@ class TruckUpdate(BaseModel):
     """Update truck details"""
     name: Optional[str] = Field(None, max_length=100)
     driver_name: Optional[str] = Field(None, max_length=100)
-    driver_phone: Optional[str] = Field(None, min_length=10, max_length=20)
+    driver_phone: Optional[Phone] = Field(None, min_length=10, max_length=20)
     zone_id: Optional[int] = None
 
 
@@ -144,13 +177,17 @@ class TruckResponse(BaseModel):
     last_heading: Optional[float]
     last_update: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
+class TruckBulkStatusRequest(BaseModel):
+    """Status of several trucks at once (admin map)"""
+    ids: List[int] = Field(..., min_length=1, max_length=200)
 
 
 class DriverLoginRequest(BaseModel):
     """Driver login with phone"""
-    phone: str = Field(..., min_length=10, max_length=20)
+    phone: Phone = Field(..., min_length=10, max_length=20)
 
 
 class DriverLoginResponse(BaseModel):
@@ -173,24 +210,56 @@ class DutyResponse(BaseModel):
 
 # ============ LOCATION SCHEMAS ============
 
+# Largest values the SmallInteger GPS columns can hold (speed is stored
+# x10, see ScaledSmallInteger); anything above is rejected, not clamped
+MAX_SPEED = 3276.7
+MAX_ACCURACY = 32767
+
+
 class LocationUpdate(BaseModel):
     """Single location update from driver app"""
     lat: float = Field(..., ge=-90, le=90)
     lng: float = Field(..., ge=-180, le=180)
-    speed: float = Field(default=0, ge=0, description="Speed in km/h")
+    speed: float = Field(default=0, ge=0, le=MAX_SPEED, description="Speed in km/h")
     heading: float = Field(default=0, ge=0, le=360, description="Direction 0-360")
-    accuracy: Optional[float] = Field(None, ge=0, description="GPS accuracy in meters")
+    accuracy: Optional[float] = Field(None, ge=0, le=MAX_ACCURACY,
+                                      description="GPS accuracy in meters")
     captured_at: datetime = Field(..., description="When GPS was captured on device")
 
 
+class LocationPoint(TypedDict):
+    """
+    One point of an offline batch (same fields and limits as LocationUpdate).
+    
+    A TypedDict, so a 1000-point batch is validated into plain dicts
+    without building a model per point. Missing speed/heading mean 0,
+    missing accuracy means unknown.
+    """
+    lat: Annotated[float, Field(ge=-90, le=90)]
+    lng: Annotated[float, Field(ge=-180, le=180)]
+    speed: NotRequired[Annotated[float, Field(ge=0, le=MAX_SPEED, description="Speed in km/h")]]
+    heading: NotRequired[Annotated[float, Field(ge=0, le=360, description="Direction 0-360")]]
+    accuracy: NotRequired[Optional[Annotated[float, Field(ge=0, le=MAX_ACCURACY,
+                                                         description="GPS accuracy in meters")]]]
+    captured_at: Annotated[datetime, Field(description="When GPS was captured on device")]
+
+
 class LocationBatchSync(BaseModel):
     """Batch sync of offline locations"""
-    locations: List[LocationUpdate] = Field(..., min_length=1, max_length=1000)
+    locations: List[LocationPoint] = Field(..., min_length=1, max_length=1000)
 
 
 class LocationSyncResponse(BaseModel):
-    """Response for batch sync"""
+    """
+    Response for batch sync.
+    
+    synced: points newly stored
+    skipped: points already stored (re-sent) or repeated in the batch
+    failed: points not stored for another reason (an invalid point
+        rejects the whole batch with 422 instead, so this is 0)
+    """
     synced: int
+    skipped: int = 0
     failed: int
     message: str
 
@@ -202,8 +271,7 @@ class RoutePoint(BaseModel):
     speed: float
     time: str  # "06:30:15"
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # ============ USER SCHEMAS ============
@@ -211,7 +279,7 @@ class RoutePoint(BaseModel):
 class UserRegister(BaseModel):
     """User registration"""
     name: str = Field(..., min_length=2, max_length=100)
-    phone: str = Field(..., min_length=10, max_length=20)
+    phone: Phone = Field(..., min_length=10, max_length=20)
     home_lat: float = Field(..., ge=-90, le=90)
     home_lng: float = Field(..., ge=-180, le=180)
     home_address: Optional[str] = Field(None, max_length=500)
@@ -219,7 +287,7 @@ class UserRegister(BaseModel):
 
 class UserLoginRequest(BaseModel):
     """User login"""
-    phone: str = Field(..., min_length=10, max_length=20)
+    phone: Phone = Field(..., min_length=10, max_length=20)
 
 
 class UserResponse(BaseModel):
@@ -236,8 +304,7 @@ class UserResponse(BaseModel):
     alert_distance: int
     alert_type: str
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class UserLoginResponse(BaseModel):
@@ -255,7 +322,7 @@ class UserSettingsUpdate(BaseModel):
     """Update user settings"""
     alert_enabled: Optional[bool] = None
     alert_distance: Optional[int] = Field(None, ge=50, le=5000)
-    alert_type: Optional[AlertType] = None
+    alert_type: Optional[AlertTypeValue] = None
 
 
 class UserHomeUpdate(BaseModel):
@@ -329,7 +396,7 @@ class TrackingResponse(BaseModel):
     truck: Optional[TruckInfo]
     distance: Optional[DistanceInfo]
     eta: Optional[ETAInfo]
-    status: TruckStatus
+    status: TruckStatusValue
     zone: ZoneInfo
     duty: Optional[DutyInfo]
     alert: Optional[AlertInfo]
@@ -337,7 +404,12 @@ class TrackingResponse(BaseModel):
 
 
 class RouteResponse(BaseModel):
-    """Route history response"""
+    """
+    Route history response.
+    
+    total_points is the number of points in `route`, i.e. after
+    simplification, not the number stored for the period.
+    """
     route: List[RoutePoint]
     total_points: int
     from_time: Optional[str]
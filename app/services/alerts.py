@@ -8,32 +8,66 @@ Handles all alert-related functionality:
     - Send push notifications (Firebase)
     - Send missed calls
     - WebSocket notifications
+    - Alert queue (checks run off the request path)
 """
 
+import asyncio
 import logging
 from datetime import date, datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple, Set, Tuple
+from sqlalchemy import select, func, case, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.models import User, Truck, AlertLog
-from app.config import settings
+from app.config import settings, is_sqlite
 from app.services.location import (
     haversine_distance, 
+    haversine_from,
+    bounding_box,
     determine_truck_status,
     get_alert_message,
     format_distance
 )
+from app.services.truck_positions import overlay_pending_position
 
 logger = logging.getLogger(__name__)
 
 
 # ============ ALERT CHECKING ============
 
+class TruckAlert(NamedTuple):
+    """An alert due to a user (from check_user_alert)."""
+    user_id: int
+    truck_id: int
+    alert_type: str
+    distance_meters: int
+    message: str
+    should_play_sound: bool
+    truck_lat: float
+    truck_lng: float
+
+
+# Priority: approaching < arriving < here
+ALERT_PRIORITY = {"approaching": 1, "arriving": 2, "here": 3}
+
+# Same priority as an SQL expression (for MAX() over today's alerts)
+alert_priority = case(
+    *[(AlertLog.alert_type == alert_type, priority)
+      for alert_type, priority in ALERT_PRIORITY.items()],
+    else_=0
+)
+
+
 def check_user_alert(
     db: Session,
     user: User,
-    truck: Truck
-) -> Optional[Dict[str, Any]]:
+    truck: Truck,
+    sent_priority: Optional[int] = None,
+    distance: Optional[float] = None,
+    today: Optional[date] = None
+) -> Optional[TruckAlert]:
     """
     Check if a user should receive an alert.
     
@@ -41,9 +75,15 @@ def check_user_alert(
         db: Database session
         user: User to check
         truck: Truck to check against
+        sent_priority: Highest priority already sent to this user for
+            this truck today (0 if none), if the caller loaded it
+            (skips the AlertLog queries)
+        distance: Truck-home distance in meters, if the caller already
+            computed it
+        today: Alert date to check against (default: date.today())
     
     Returns:
-        Alert info dict if alert should be sent, None otherwise
+        TruckAlert if alert should be sent, None otherwise
     """
     # Skip if alerts disabled
     if not user.alert_enabled:
@@ -58,76 +98,78 @@ def check_user_alert(
         return None
     
     # Calculate distance
-    distance = haversine_distance(
-        truck.last_lat, truck.last_lng,
-        user.home_lat, user.home_lng
-    )
-    
-    # Determine status
-    status = determine_truck_status(
-        distance_meters=distance,
-        is_active=truck.is_active,
-        has_location=True
-    )
+    if distance is None:
+        distance = haversine_distance(
+            truck.last_lat, truck.last_lng,
+            user.home_lat, user.home_lng
+        )
     
-    # Check if this status should trigger alert
-    alert_type = None
-    if status == "here" and distance < settings.ALERT_DISTANCE_HERE:
+    # Which alert this distance triggers. The truck is active and has a
+    # location (checked above), so its status is purely distance-based
+    # (see determine_truck_status) and maps straight to the alert type
+    if distance < settings.ALERT_DISTANCE_HERE:
         alert_type = "here"
-    elif status == "arriving" and distance < settings.ALERT_DISTANCE_ARRIVING:
+    elif distance < settings.ALERT_DISTANCE_ARRIVING:
         alert_type = "arriving"
-    elif status == "approaching" and distance < settings.ALERT_DISTANCE_APPROACHING:
+    elif (distance < settings.ALERT_DISTANCE_APPROACHING
+          and distance <= user.alert_distance):
         # Only alert if within user's preferred distance
-        if distance <= user.alert_distance:
-            alert_type = "approaching"
+        alert_type = "approaching"
+    else:
+        alert_type = None
     
     if alert_type is None:
         return None
     
-    # Check if already alerted today
-    today = date.today()
-    existing_alert = db.query(AlertLog).filter(
-        AlertLog.user_id == user.id,
-        AlertLog.truck_id == truck.id,
-        AlertLog.alert_date == today,
-        AlertLog.alert_type == alert_type
-    ).first()
-    
-    if existing_alert:
-        return None
-    
-    # Also check if a higher priority alert was already sent
-    # Priority: approaching < arriving < here
-    priority_map = {"approaching": 1, "arriving": 2, "here": 3}
-    current_priority = priority_map.get(alert_type, 0)
-    
-    higher_alert = db.query(AlertLog).filter(
-        AlertLog.user_id == user.id,
-        AlertLog.truck_id == truck.id,
-        AlertLog.alert_date == today
-    ).all()
-    
-    for alert in higher_alert:
-        if priority_map.get(alert.alert_type, 0) >= current_priority:
+    # Already sent (this one or a higher priority one)?
+    if sent_priority is not None:
+        if sent_priority >= ALERT_PRIORITY[alert_type]:
             return None
+        return _alert_info(user, truck, alert_type, distance)
+    
+    # Already sent today (this one or a higher priority one)? One probe
+    # of the (user_id, truck_id, alert_date, alert_type) index
+    already_sent = db.scalar(
+        select(
+            select(AlertLog.id)
+            .where(
+                AlertLog.user_id == user.id,
+                AlertLog.truck_id == truck.id,
+                AlertLog.alert_date == (today or date.today()),
+                alert_priority >= ALERT_PRIORITY[alert_type]
+            )
+            .exists()
+        )
+    )
+    if already_sent:
+        return None
     
-    # Return alert info
-    return {
-        "user_id": user.id,
-        "truck_id": truck.id,
-        "alert_type": alert_type,
-        "distance_meters": int(distance),
-        "message": get_alert_message(alert_type, int(distance)),
-        "should_play_sound": alert_type in ["arriving", "here"],
-        "truck_lat": truck.last_lat,
-        "truck_lng": truck.last_lng
-    }
+    return _alert_info(user, truck, alert_type, distance)
+
+
+def _alert_info(
+    user: User,
+    truck: Truck,
+    alert_type: str,
+    distance: float
+) -> TruckAlert:
+    """Alert for check_user_alert."""
+    return TruckAlert(
+        user_id=user.id,
+        truck_id=truck.id,
+        alert_type=alert_type,
+        distance_meters=int(distance),
+        message=get_alert_message(alert_type, int(distance)),
+        should_play_sound=alert_type in ["arriving", "here"],
+        truck_lat=truck.last_lat,
+        truck_lng=truck.last_lng
+    )
 
 
 def check_alerts_for_truck(
     db: Session,
     truck: Truck
-) -> List[Dict[str, Any]]:
+) -> List[TruckAlert]:
     """
     Check all users in truck's zone for alerts.
     
@@ -136,21 +178,60 @@ def check_alerts_for_truck(
         truck: Truck that updated location
     
     Returns:
-        List of alert info dicts
+        List of TruckAlerts
     """
     if not truck.zone_id:
         return []
     
-    # Get all users in this zone with alerts enabled
-    users = db.query(User).filter(
-        User.zone_id == truck.zone_id,
-        User.alert_enabled == True,
-        User.is_active == True
+    if not truck.is_active or truck.last_lat is None or truck.last_lng is None:
+        return []
+    
+    today = date.today()
+    
+    # Highest alert priority each user already got from this truck today
+    sent = (
+        select(AlertLog.user_id, func.max(alert_priority).label("priority"))
+        .where(
+            AlertLog.truck_id == truck.id,
+            AlertLog.alert_date == today
+        )
+        .group_by(AlertLog.user_id)
+        .subquery()
+    )
+    
+    # Only homes that can be within alert range (cheap box prefilter,
+    # a range scan on idx_users_zone_home; the exact distance is
+    # checked per user)
+    max_distance = max(settings.ALERT_DISTANCE_APPROACHING,
+                       settings.ALERT_DISTANCE_ARRIVING,
+                       settings.ALERT_DISTANCE_HERE)
+    min_lat, max_lat, min_lng, max_lng = bounding_box(
+        truck.last_lat, truck.last_lng, max_distance
+    )
+    
+    # Users in this zone with alerts enabled + what they were sent, in one query
+    rows = db.execute(
+        select(User, func.coalesce(sent.c.priority, 0))
+        .outerjoin(sent, sent.c.user_id == User.id)
+        .where(
+            User.zone_id == truck.zone_id,
+            User.alert_enabled == True,
+            User.is_active == True,
+            User.home_lat.between(min_lat, max_lat),
+            User.home_lng.between(min_lng, max_lng)
+        )
     ).all()
     
+    # Truck-side trig once for all users; homes in the box corners but
+    # out of range are dropped before the per-user checks
+    distance_to = haversine_from(truck.last_lat, truck.last_lng)
+    
     alerts = []
-    for user in users:
-        alert = check_user_alert(db, user, truck)
+    for user, sent_priority in rows:
+        distance = distance_to(user.home_lat, user.home_lng)
+        if distance >= max_distance:
+            continue
+        alert = check_user_alert(db, user, truck, sent_priority, distance, today)
         if alert:
             alerts.append(alert)
     
@@ -159,75 +240,92 @@ def check_alerts_for_truck(
 
 # ============ ALERT LOGGING ============
 
-def log_alert(
+# Core INSERT for alert logs; an alert already logged today (same user,
+# truck, date and type - see idx_alert_unique) is silently skipped.
+alert_log_insert = (
+    sqlite.insert(AlertLog) if is_sqlite() else postgresql.insert(AlertLog)
+).on_conflict_do_nothing()
+
+
+def log_alerts_bulk(
     db: Session,
-    user_id: int,
-    truck_id: int,
-    alert_type: str,
-    distance_meters: int,
-    truck_lat: float,
-    truck_lng: float,
-    delivery_method: str = "push"
-) -> AlertLog:
+    delivered: List[Tuple[TruckAlert, str]]
+) -> int:
     """
-    Log an alert to prevent duplicate sending.
+    Log several alerts in one transaction.
+    
+    One multi-row INSERT for the AlertLog rows and one UPDATE for the
+    users' last alert info, instead of an INSERT + UPDATE + commit
+    per alert.
     
     Args:
         db: Database session
-        user_id: User who received alert
-        truck_id: Truck that triggered alert
-        alert_type: Type of alert (approaching/arriving/here)
-        distance_meters: Distance when alert was sent
-        truck_lat, truck_lng: Truck location when alert sent
-        delivery_method: How alert was delivered (push/missed_call/sound)
+        delivered: (alert_info, delivery_method) pairs
     
     Returns:
-        Created AlertLog record
+        Number of alerts logged
     """
-    alert_log = AlertLog(
-        user_id=user_id,
-        truck_id=truck_id,
-        alert_date=date.today(),
-        alert_type=alert_type,
-        distance_meters=distance_meters,
-        truck_lat=truck_lat,
-        truck_lng=truck_lng,
-        delivery_method=delivery_method,
-        delivered=True
-    )
-    
-    db.add(alert_log)
+    if not delivered:
+        return 0
     
-    # Update user's last alert info
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.last_alert_type = alert_type
-        user.last_alert_at = datetime.utcnow()
+    today = date.today()
+    db.execute(alert_log_insert, [
+        {
+            "user_id": alert_info.user_id,
+            "truck_id": alert_info.truck_id,
+            "alert_date": today,
+            "alert_type": alert_info.alert_type,
+            "distance_meters": alert_info.distance_meters,
+            "truck_lat": alert_info.truck_lat,
+            "truck_lng": alert_info.truck_lng,
+            "delivery_method": delivery_method,
+            "delivered": True
+        }
+        for alert_info, delivery_method in delivered
+    ])
+    
+    last_types = {
+        alert_info.user_id: alert_info.alert_type
+        for alert_info, _ in delivered
+    }
+    db.execute(
+        update(User)
+        .where(User.id.in_(last_types))
+        .values(
+            last_alert_type=case(last_types, value=User.id),
+            last_alert_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
     
     db.commit()
-    
-    return alert_log
+    return len(delivered)
 
 
 def reset_user_alerts(db: Session, user_id: int):
     """
     Reset user's alert state (call when truck leaves zone or day changes).
     
+    Flushed but left for the caller to commit, like reset_zone_alerts.
+    
     Args:
         db: Database session
         user_id: User to reset
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if user:
         user.last_alert_type = None
         user.last_alert_at = None
-        db.commit()
+        db.flush()
 
 
 def reset_zone_alerts(db: Session, zone_id: int):
     """
     Reset alert state for all users in a zone.
     
+    One UPDATE (uses the users (zone_id, is_active) index), left for the
+    caller to commit together with its own changes.
+    
     Args:
         db: Database session
         zone_id: Zone to reset
@@ -235,12 +333,36 @@ def reset_zone_alerts(db: Session, zone_id: int):
     db.query(User).filter(User.zone_id == zone_id).update({
         User.last_alert_type: None,
         User.last_alert_at: None
-    })
-    db.commit()
+    }, synchronize_session=False)
 
 
 # ============ NOTIFICATION SENDING ============
 
+# Shared HTTP client for FCM / missed-call requests, so alerts reuse
+# pooled keep-alive connections instead of a new TLS handshake each
+_http_client = None
+
+
+def _get_http_client():
+    """Return the shared httpx.AsyncClient, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (call on shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 async def send_push_notification(
     fcm_token: str,
     title: str,
@@ -266,34 +388,32 @@ async def send_push_notification(
         return False
     
     try:
-        import httpx
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://fcm.googleapis.com/fcm/send",
-                headers={
-                    "Authorization": f"key={settings.FCM_SERVER_KEY}",
-                    "Content-Type": "application/json"
+        client = _get_http_client()
+        response = await client.post(
+            "https://fcm.googleapis.com/fcm/send",
+            headers={
+                "Authorization": f"key={settings.FCM_SERVER_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "to": fcm_token,
+                "notification": {
+                    "title": title,
+                    "body": body,
+                    "sound": "default"
                 },
-                json={
-                    "to": fcm_token,
-                    "notification": {
-                        "title": title,
-                        "body": body,
-                        "sound": "default"
-                    },
-                    "data": data or {},
-                    "priority": "high"
-                }
-            )
+                "data": data or {},
+                "priority": "high"
+            }
+        )
+        
+        if response.status_code == 200:
+            logger.info(f"Push notification sent successfully")
+            return True
+        else:
+            logger.error(f"FCM error: {response.text}")
+            return False
             
-            if response.status_code == 200:
-                logger.info(f"Push notification sent successfully")
-                return True
-            else:
-                logger.error(f"FCM error: {response.text}")
-                return False
-                
     except Exception as e:
         logger.error(f"Error sending push notification: {e}")
         return False
@@ -316,64 +436,61 @@ async def send_missed_call(phone: str) -> bool:
         return False
     
     try:
-        import httpx
+        client = _get_http_client()
+        # This is a generic example - adjust for your actual provider
+        # (MSG91, Exotel, Twilio, etc.)
+        response = await client.post(
+            settings.MISSED_CALL_API_URL,
+            headers={
+                "Authorization": f"Bearer {settings.MISSED_CALL_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "to": phone,
+                "duration": 5  # Ring for 5 seconds
+            }
+        )
         
-        async with httpx.AsyncClient() as client:
-            # This is a generic example - adjust for your actual provider
-            # (MSG91, Exotel, Twilio, etc.)
-            response = await client.post(
-                settings.MISSED_CALL_API_URL,
-                headers={
-                    "Authorization": f"Bearer {settings.MISSED_CALL_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "to": phone,
-                    "duration": 5  # Ring for 5 seconds
-                }
-            )
+        if response.status_code in [200, 201]:
+            logger.info(f"Missed call initiated to {phone}")
+            return True
+        else:
+            logger.error(f"Missed call error: {response.text}")
+            return False
             
-            if response.status_code in [200, 201]:
-                logger.info(f"Missed call initiated to {phone}")
-                return True
-            else:
-                logger.error(f"Missed call error: {response.text}")
-                return False
-                
     except Exception as e:
         logger.error(f"Error initiating missed call: {e}")
         return False
 
 
-async def send_alert(
-    db: Session,
-    alert_info: Dict[str, Any],
+async def deliver_alert(
+    alert_info: TruckAlert,
     user: User
-) -> bool:
+) -> Optional[str]:
     """
-    Send alert to user based on their preferences.
+    Deliver alert to user based on their preferences (doesn't log it).
     
     Args:
-        db: Database session
-        alert_info: Alert information dict
+        alert_info: Alert to deliver
         user: User to send alert to
     
     Returns:
-        True if at least one delivery method succeeded
+        Delivery method to log (push/missed_call/both/sound),
+        or None if nothing was delivered
     """
     success = False
     delivery_method = "sound"  # Default
     
     # Prepare notification content
     title = "🚛 Garbage Truck Alert"
-    body = alert_info["message"]
+    body = alert_info.message
     data = {
         "type": "truck_alert",
-        "alert_type": alert_info["alert_type"],
-        "distance": str(alert_info["distance_meters"]),
-        "play_sound": str(alert_info["should_play_sound"]),
-        "truck_lat": str(alert_info["truck_lat"]),
-        "truck_lng": str(alert_info["truck_lng"])
+        "alert_type": alert_info.alert_type,
+        "distance": str(alert_info.distance_meters),
+        "play_sound": str(alert_info.should_play_sound),
+        "truck_lat": str(alert_info.truck_lat),
+        "truck_lng": str(alert_info.truck_lng)
     }
     
     # Send based on user preference
@@ -392,21 +509,100 @@ async def send_alert(
             success = True
             delivery_method = "missed_call" if delivery_method == "sound" else "both"
     
-    # Log the alert
     if success or user.alert_type == "sound":
-        log_alert(
-            db=db,
-            user_id=alert_info["user_id"],
-            truck_id=alert_info["truck_id"],
-            alert_type=alert_info["alert_type"],
-            distance_meters=alert_info["distance_meters"],
-            truck_lat=alert_info["truck_lat"],
-            truck_lng=alert_info["truck_lng"],
-            delivery_method=delivery_method
-        )
-        return True
+        return delivery_method
     
-    return success
+    return None
+
+
+# ============ ALERT QUEUE ============
+
+# Trucks with a new position whose alerts haven't been checked yet
+_due_trucks: Set[int] = set()
+
+
+def schedule_alert_check(truck_id: int):
+    """
+    Queue an alert check for a truck (run by run_alert_worker).
+    
+    Several updates from the same truck before the next run
+    collapse into one check against its newest position.
+    """
+    _due_trucks.add(truck_id)
+
+
+def load_alert_recipients(truck_id: int) -> List[Tuple[TruckAlert, User]]:
+    """
+    Find the alerts due for one truck and their users, in its own DB
+    session (run in a worker thread; the users come back detached).
+    """
+    db = SessionLocal()
+    try:
+        truck = db.get(Truck, truck_id)
+        if not truck:
+            return []
+        overlay_pending_position(truck)
+        
+        recipients = [
+            (alert_info, db.get(User, alert_info.user_id))
+            for alert_info in check_alerts_for_truck(db, truck)
+        ]
+        return [(alert_info, user) for alert_info, user in recipients if user]
+    finally:
+        db.close()
+
+
+def log_delivered_alerts(delivered: List[Tuple[TruckAlert, str]]):
+    """log_alerts_bulk in its own DB session (run in a worker thread)."""
+    db = SessionLocal()
+    try:
+        log_alerts_bulk(db, delivered)
+    finally:
+        db.close()
+
+
+async def process_truck_alerts(truck_id: int):
+    """
+    Check and send alerts for one truck.
+    
+    The DB phases run in worker threads (like the WebSocket DB work),
+    so sockets and async routes aren't stalled while they wait on the
+    database; only the concurrent deliveries run on the event loop.
+    """
+    try:
+        recipients = await asyncio.to_thread(load_alert_recipients, truck_id)
+        if not recipients:
+            return
+        
+        # Deliver all alerts concurrently (over the shared client), then
+        # log everything delivered in one transaction
+        methods = await asyncio.gather(*(
+            deliver_alert(alert_info, user) for alert_info, user in recipients
+        ))
+        delivered = [
+            (alert_info, delivery_method)
+            for (alert_info, _), delivery_method in zip(recipients, methods)
+            if delivery_method is not None
+        ]
+        
+        if delivered:
+            await asyncio.to_thread(log_delivered_alerts, delivered)
+                
+    except Exception as e:
+        # Log error but don't stop the worker
+        logger.error(f"Error processing alerts for truck {truck_id}: {e}")
+
+
+async def run_alert_worker(interval: float):
+    """Background task: check alerts for queued trucks every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        # Trucks are queued from request threads, so only drop the
+        # ones taken here (a clear() could lose one added meanwhile)
+        truck_ids = list(_due_trucks)
+        _due_trucks.difference_update(truck_ids)
+        for truck_id in truck_ids:
+            await process_truck_alerts(truck_id)
 
 
 # ============ ALERT INFO FOR RESPONSE ============
@@ -415,7 +611,10 @@ def get_alert_info_for_user(
     db: Session,
     user: User,
     truck: Truck,
-    distance_meters: float
+    distance_meters: float,
+    sent_today: Optional[Set[str]] = None,
+    today: Optional[date] = None,
+    status: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Get alert info to include in tracking response.
@@ -428,6 +627,11 @@ def get_alert_info_for_user(
         user: User making request
         truck: Truck being tracked
         distance_meters: Current distance
+        sent_today: Alert types already sent to this user for this truck
+            today, if the caller loaded them (skips the AlertLog query)
+        today: Alert date to check against (default: date.today())
+        status: Truck status for this distance, if the caller already
+            determined it (for its own response)
     
     Returns:
         Alert info dict or None
@@ -435,11 +639,12 @@ def get_alert_info_for_user(
     if not user.alert_enabled:
         return None
     
-    status = determine_truck_status(
-        distance_meters=distance_meters,
-        is_active=truck.is_active,
-        has_location=truck.last_lat is not None
-    )
+    if status is None:
+        status = determine_truck_status(
+            distance_meters=distance_meters,
+            is_active=truck.is_active,
+            has_location=truck.last_lat is not None
+        )
     
     # Determine alert type based on distance
     alert_type = None
@@ -456,15 +661,16 @@ def get_alert_info_for_user(
         return None
     
     # Check if already alerted
-    today = date.today()
-    existing = db.query(AlertLog).filter(
-        AlertLog.user_id == user.id,
-        AlertLog.truck_id == truck.id,
-        AlertLog.alert_date == today,
-        AlertLog.alert_type == alert_type
-    ).first()
-    
-    should_alert = existing is None
+    if sent_today is not None:
+        should_alert = alert_type not in sent_today
+    else:
+        existing = db.query(AlertLog).filter(
+            AlertLog.user_id == user.id,
+            AlertLog.truck_id == truck.id,
+            AlertLog.alert_date == (today or date.today()),
+            AlertLog.alert_type == alert_type
+        ).first()
+        should_alert = existing is None
     
     return {
         "should_alert": should_alert,
@@ -4,20 +4,29 @@ Location Service
 ================
 All location-related calculations:
     - Distance calculation (Haversine formula)
+    - Route simplification (Ramer-Douglas-Peucker)
     - ETA estimation
     - Truck status determination
     - Time formatting utilities
 """
 
 import math
-from datetime import datetime, timedelta
-from typing import Tuple, Optional
+import time
+from math import asin, cos, sin, sqrt
+from datetime import datetime, timedelta, time as time_of_day
+from functools import lru_cache
+from typing import Callable, List, Tuple, Optional, Union
 
 from app.config import settings
 
 
 # ============ DISTANCE CALCULATION ============
 
+EARTH_RADIUS_M = 6371000.0
+_DEG_TO_RAD = math.pi / 180
+# Length of one degree of latitude (or of longitude at the equator)
+METERS_PER_DEGREE = EARTH_RADIUS_M * _DEG_TO_RAD
+
 def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """
     Calculate the distance between two points on Earth using Haversine formula.
@@ -33,20 +42,72 @@ def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
         >>> haversine_distance(12.9716, 77.5946, 12.9500, 77.6000)
         2487.34  # meters
     """
-    R = 6371000  # Earth's radius in meters
+    # Haversine formula (sines of the half-deltas, in radians)
+    sin_dphi = sin((lat2 - lat1) * _DEG_TO_RAD * 0.5)
+    sin_dlambda = sin((lng2 - lng1) * _DEG_TO_RAD * 0.5)
+    a = (sin_dphi * sin_dphi +
+         cos(lat1 * _DEG_TO_RAD) * cos(lat2 * _DEG_TO_RAD) * sin_dlambda * sin_dlambda)
+    
+    # 2 * asin(sqrt(a)) == 2 * atan2(sqrt(a), sqrt(1 - a)); clamped for rounding
+    return 2 * EARTH_RADIUS_M * asin(sqrt(min(a, 1.0)))
+
+
+def haversine_from(lat1: float, lng1: float) -> Callable[[float, float], float]:
+    """
+    Haversine distance from a fixed point, for use in loops.
     
-    # Convert to radians
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lng2 - lng1)
+    The origin's radians/cosine are computed once instead of on every
+    call. Same result as haversine_distance(lat1, lng1, lat2, lng2).
     
-    # Haversine formula
-    a = (math.sin(delta_phi / 2) ** 2 + 
-         math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    Example:
+        >>> distance_to = haversine_from(12.9716, 77.5946)
+        >>> distance_to(12.9500, 77.6000)
+        2487.34  # meters
+    """
+    cos_phi1 = cos(lat1 * _DEG_TO_RAD)
     
-    return R * c
+    def distance_to(lat2: float, lng2: float) -> float:
+        sin_dphi = sin((lat2 - lat1) * _DEG_TO_RAD * 0.5)
+        sin_dlambda = sin((lng2 - lng1) * _DEG_TO_RAD * 0.5)
+        a = (sin_dphi * sin_dphi +
+             cos_phi1 * cos(lat2 * _DEG_TO_RAD) * sin_dlambda * sin_dlambda)
+        return 2 * EARTH_RADIUS_M * asin(sqrt(min(a, 1.0)))
+    
+    return distance_to
+
+
+def bounding_box(lat: float, lng: float, radius_meters: float) -> Tuple[float, float, float, float]:
+    """
+    Smallest lat/lng box containing every point within radius_meters.
+    
+    Cheap pre-filter for haversine_distance: points outside the box
+    can be skipped with four comparisons instead of the trig.
+    
+    Args:
+        lat, lng: Center point
+        radius_meters: Search radius
+    
+    Returns:
+        (min_lat, max_lat, min_lng, max_lng)
+    """
+    angular = radius_meters / EARTH_RADIUS_M
+    delta_lat = math.degrees(angular)
+    
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat <= math.sin(angular):
+        # Circle reaches a pole - every longitude is possible
+        return (lat - delta_lat, lat + delta_lat, -180.0, 180.0)
+    
+    delta_lng = math.degrees(math.asin(math.sin(angular) / cos_lat))
+    if lng - delta_lng < -180 or lng + delta_lng > 180:
+        # Crosses the antimeridian - don't filter on longitude
+        return (lat - delta_lat, lat + delta_lat, -180.0, 180.0)
+    
+    return (lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng)
+
+
+# "0 m" .. "999 m", built once (most displayed distances are under 1 km)
+_METER_TEXTS = tuple(f"{m} m" for m in range(1000))
 
 
 def format_distance(meters: float) -> str:
@@ -66,7 +127,8 @@ def format_distance(meters: float) -> str:
         "1.5 km"
     """
     if meters < 1000:
-        return f"{int(meters)} m"
+        # Cached text for 0-999; negatives (shouldn't happen) are formatted
+        return _METER_TEXTS[int(meters)] if meters >= 0 else f"{int(meters)} m"
     else:
         km = meters / 1000
         if km < 10:
@@ -75,28 +137,93 @@ def format_distance(meters: float) -> str:
             return f"{int(km)} km"
 
 
+# ============ ROUTE SIMPLIFICATION ============
+
+def simplify_route(points: List[Tuple[float, float]], epsilon_meters: float) -> List[int]:
+    """
+    Simplify a GPS track with the Ramer-Douglas-Peucker algorithm.
+    
+    Drops points that are within epsilon_meters of the simplified line,
+    so straight stretches collapse to their end points while turns are
+    kept. Uses distance to the segment (not the infinite line), so a
+    truck doubling back down the same street is preserved.
+    
+    Args:
+        points: (lat, lng) pairs in route order
+        epsilon_meters: Max allowed deviation (0 = keep everything)
+    
+    Returns:
+        Indexes of the points to keep (always includes first and last)
+    """
+    n = len(points)
+    if n < 3 or epsilon_meters <= 0:
+        return list(range(n))
+    
+    # Project to local planar meters (fine at city scale)
+    meters_per_degree_lng = METERS_PER_DEGREE * math.cos(math.radians(points[0][0]))
+    ys = [lat * METERS_PER_DEGREE for lat, _ in points]
+    xs = [lng * meters_per_degree_lng for _, lng in points]
+    
+    epsilon_sq = epsilon_meters * epsilon_meters
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        segment_sq = dx * dx + dy * dy
+        
+        max_sq = 0.0
+        index = -1
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if segment_sq > 0:
+                t = max(0.0, min(1.0, (px * dx + py * dy) / segment_sq))
+                px -= t * dx
+                py -= t * dy
+            dist_sq = px * px + py * py
+            if dist_sq > max_sq:
+                max_sq = dist_sq
+                index = i
+        
+        if max_sq > epsilon_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    
+    return [i for i in range(n) if keep[i]]
+
+
 # ============ ETA CALCULATION ============
 
-def get_traffic_multiplier() -> float:
+# Rush hours (local time): morning 7-10 AM, evening 5-8 PM
+_PEAK_HOURS = (range(7, 10), range(17, 20))
+
+# Multiplier for each hour of the day, built once (settings are frozen
+# at import)
+_HOURLY_TRAFFIC = tuple(
+    settings.TRAFFIC_PEAK_MULTIPLIER
+    if any(hour in peak for peak in _PEAK_HOURS)
+    else settings.TRAFFIC_NORMAL_MULTIPLIER
+    for hour in range(24)
+)
+
+
+def get_traffic_multiplier(now: Optional[datetime] = None) -> float:
     """
     Get traffic multiplier based on current time of day.
     
     Rush hours get higher multiplier (slower travel).
     
+    Args:
+        now: Current local time (default: datetime.now())
+    
     Returns:
         Multiplier value (1.0 = normal, 1.5 = heavy traffic)
     """
-    hour = datetime.now().hour
-    
-    # Morning rush: 7-10 AM
-    if 7 <= hour < 10:
-        return settings.TRAFFIC_PEAK_MULTIPLIER
-    # Evening rush: 5-8 PM
-    elif 17 <= hour < 20:
-        return settings.TRAFFIC_PEAK_MULTIPLIER
-    # Normal hours
-    else:
-        return settings.TRAFFIC_NORMAL_MULTIPLIER
+    return _HOURLY_TRAFFIC[(now or datetime.now()).hour]
 
 
 def estimate_eta(
@@ -128,7 +255,8 @@ def estimate_eta(
         avg_speed_kmh = settings.AVG_TRUCK_SPEED
     
     # Apply traffic multiplier
-    traffic = get_traffic_multiplier()
+    now = datetime.now()
+    traffic = get_traffic_multiplier(now)
     effective_speed = avg_speed_kmh / traffic
     
     # Calculate time
@@ -157,20 +285,26 @@ def estimate_eta(
             text = f"~{hours}h"
     
     # Calculate arrival time
-    arrival = datetime.now() + timedelta(minutes=minutes)
-    arrival_time = arrival.strftime("%I:%M %p")
+    arrival = now + timedelta(minutes=minutes)
+    arrival_time = clock_text(arrival.hour, arrival.minute)
     
     return minutes, text, arrival_time
 
 
 # ============ TIME FORMATTING ============
 
-def format_time_ago(dt: Optional[datetime]) -> Optional[int]:
+# Stored datetimes are naive UTC; seconds since this epoch + time.time()
+# give "now - dt" without building a utcnow() datetime each call
+_EPOCH = datetime(1970, 1, 1)
+
+
+def format_time_ago(dt: Optional[datetime], now: Optional[datetime] = None) -> Optional[int]:
     """
     Calculate seconds since a datetime.
     
     Args:
         dt: Datetime to compare against now
+        now: Current UTC time (pass it in when calling in a loop)
     
     Returns:
         Seconds ago, or None if dt is None
@@ -179,7 +313,8 @@ def format_time_ago(dt: Optional[datetime]) -> Optional[int]:
         return None
     
     # Ensure we're comparing UTC times
-    now = datetime.utcnow()
+    if now is None:
+        return max(0, int(time.time() - (dt - _EPOCH).total_seconds()))
     diff = now - dt
     return max(0, int(diff.total_seconds()))
 
@@ -223,9 +358,7 @@ def format_duration(start_time: Optional[datetime]) -> Optional[str]:
     if start_time is None:
         return None
     
-    now = datetime.utcnow()
-    diff = now - start_time
-    total_minutes = int(diff.total_seconds() / 60)
+    total_minutes = int((time.time() - (start_time - _EPOCH).total_seconds()) / 60)
     
     if total_minutes < 0:
         return "0m"
@@ -239,19 +372,28 @@ def format_duration(start_time: Optional[datetime]) -> Optional[str]:
         return f"{minutes}m"
 
 
-def format_time(dt: Optional[datetime]) -> Optional[str]:
+def format_time(dt: Optional[Union[datetime, time_of_day]]) -> Optional[str]:
     """
-    Format datetime as time string.
+    Format datetime (or time of day) as time string.
     
     Args:
-        dt: Datetime to format
+        dt: Datetime or time to format
     
     Returns:
         Time string like "06:30 AM", or None if dt is None
     """
     if dt is None:
         return None
-    return dt.strftime("%I:%M %p")
+    return clock_text(dt.hour, dt.minute)
+
+
+@lru_cache(maxsize=24 * 60)
+def clock_text(hour: int, minute: int) -> str:
+    """
+    Format a time of day like "06:30 AM" (cached - there are only
+    1440 of them, so strftime runs once per minute of the day).
+    """
+    return time_of_day(hour, minute).strftime("%I:%M %p")
 
 
 # ============ ZONE HELPERS ============
@@ -315,6 +457,10 @@ def determine_truck_status(
         return "approaching"
 
 
+# Alert priority: approaching < arriving < here
+_ALERT_PRIORITY = {"approaching": 1, "arriving": 2, "here": 3}
+
+
 def should_trigger_alert(
     current_status: str,
     last_alert_type: Optional[str],
@@ -334,32 +480,27 @@ def should_trigger_alert(
     if not alert_enabled:
         return False, None
     
-    # Map status to alert type
-    alert_map = {
-        "approaching": "approaching",
-        "arriving": "arriving",
-        "here": "here"
-    }
-    
-    if current_status not in alert_map:
+    if current_status not in _ALERT_PRIORITY:
         return False, None
     
-    alert_type = alert_map[current_status]
+    # Status names double as alert types
+    alert_type = current_status
     
     # Check if this alert already sent
-    # Alert priority: approaching < arriving < here
-    priority = {"approaching": 1, "arriving": 2, "here": 3}
-    
-    if last_alert_type and priority.get(alert_type, 0) <= priority.get(last_alert_type, 0):
+    if last_alert_type and _ALERT_PRIORITY[alert_type] <= _ALERT_PRIORITY.get(last_alert_type, 0):
         return False, None
     
     return True, alert_type
 
 
+@lru_cache(maxsize=4096)
 def get_alert_message(alert_type: str, distance_meters: int) -> str:
     """
     Get alert message based on type.
     
+    Cached: alert distances are whole meters within a few km, so
+    users near the same truck keep hitting the same few messages.
+    
     Args:
         alert_type: Type of alert
         distance_meters: Current distance
@@ -367,9 +508,10 @@ def get_alert_message(alert_type: str, distance_meters: int) -> str:
     Returns:
         Alert message string
     """
-    messages = {
-        "approaching": f"🚛 Garbage truck is {format_distance(distance_meters)} away!",
-        "arriving": f"🚛 Truck almost here! Only {format_distance(distance_meters)} away!",
-        "here": "🚛 Garbage truck has arrived at your area!"
-    }
-    return messages.get(alert_type, "🚛 Garbage truck update")
\ No newline at end of file
+    if alert_type == "approaching":
+        return f"🚛 Garbage truck is {format_distance(distance_meters)} away!"
+    if alert_type == "arriving":
+        return f"🚛 Truck almost here! Only {format_distance(distance_meters)} away!"
+    if alert_type == "here":
+        return "🚛 Garbage truck has arrived at your area!"
+    return "🚛 Garbage truck update"
\ No newline at end of file
@@ -0,0 +1,252 @@
+# app/services/truck_positions.py
+"""
+Truck Position Buffer
+=====================
+Coalesces the writes made by every GPS update:
+    - the new truck_locations history row
+    - the cached Truck.last_* columns
+
+Instead of one INSERT + UPDATE + commit per update, rows are kept in
+memory and written together in one transaction every
+LOCATION_FLUSH_INTERVAL seconds (and once more on shutdown). For the
+trucks row only the newest position per truck is written.
+
+Readers in this process see the pending position via
+overlay_pending_position(), so responses are never behind.
+
+Buffered rows are only in memory until flushed, so /location answers
+202 Accepted. At most LOCATION_BUFFER_MAX history rows are held; when
+the buffer is full (e.g. the DB is down) new points are refused and
+the driver app keeps them for /sync. If a batch fails, it's retried
+row by row and rows the DB rejects (constraint/data errors) are logged
+and dropped, so one bad row can't block the rest.
+
+Usage:
+    record_position(truck_id, lat, lng, speed, heading, datetime.utcnow())
+    if not queue_location({"truck_id": truck_id, "latitude": ..., ...}):
+        ...  # buffer full, retry later
+    truck = overlay_pending_position(truck)
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import update, bindparam, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import settings, is_sqlite
+from app.database import SessionLocal
+from app.models import Truck, TruckLocation
+
+logger = logging.getLogger(__name__)
+
+
+class PendingPosition(NamedTuple):
+    """Latest not-yet-flushed position of a truck."""
+    lat: float
+    lng: float
+    speed: float
+    heading: float
+    updated_at: datetime
+
+
+# truck_id -> newest pending position
+_pending: Dict[int, PendingPosition] = {}
+# truck_id -> newest position recorded here, kept after it's flushed so
+# rows cached before the flush (see zone_snapshots) can't go backwards
+_latest: Dict[int, PendingPosition] = {}
+# truck_locations rows waiting to be inserted
+_pending_locations: List[dict] = []
+_lock = threading.Lock()
+
+# Core INSERT for GPS points (skips ORM unit-of-work on the hottest write path).
+# A re-sent point (same truck + captured_at) is silently skipped.
+location_insert = (
+    sqlite.insert(TruckLocation) if is_sqlite() else postgresql.insert(TruckLocation)
+).on_conflict_do_nothing()
+
+_trucks = Truck.__table__
+
+# Batched UPDATE; never overwrites a newer value (e.g. from /sync
+# or another worker) with an older one.
+_flush_stmt = (
+    update(_trucks)
+    .where(
+        _trucks.c.id == bindparam("b_id"),
+        or_(_trucks.c.last_update.is_(None),
+            _trucks.c.last_update < bindparam("b_updated_at"))
+    )
+    .values(
+        last_lat=bindparam("b_lat"),
+        last_lng=bindparam("b_lng"),
+        last_speed=bindparam("b_speed"),
+        last_heading=bindparam("b_heading"),
+        last_update=bindparam("b_updated_at")
+    )
+)
+
+
+def record_position(
+    truck_id: int,
+    lat: float,
+    lng: float,
+    speed: float,
+    heading: float,
+    updated_at: datetime
+):
+    """Buffer a truck's latest position (flushed by flush_positions)."""
+    with _lock:
+        position = PendingPosition(lat, lng, speed, heading, updated_at)
+        _pending[truck_id] = position
+        _latest[truck_id] = position
+
+
+def queue_location(row: dict) -> bool:
+    """
+    Buffer a truck_locations row (inserted by flush_positions).
+
+    Returns:
+        False (row not buffered) if LOCATION_BUFFER_MAX rows are waiting
+    """
+    with _lock:
+        if len(_pending_locations) >= settings.LOCATION_BUFFER_MAX:
+            return False
+        _pending_locations.append(row)
+        return True
+
+
+def get_latest_position(truck_id: int) -> Optional[PendingPosition]:
+    """Newest position recorded by this process (flushed or not), if any."""
+    return _latest.get(truck_id)
+
+
+def pending_truck_ids() -> List[int]:
+    """IDs of trucks whose latest position isn't flushed yet."""
+    with _lock:
+        return list(_pending)
+
+
+def overlay_pending_position(truck: Truck) -> Truck:
+    """
+    Show a not-yet-flushed position on a loaded Truck.
+
+    Uses set_committed_value so the truck isn't marked dirty
+    (nothing extra gets written if the session commits).
+    """
+    pending = _pending.get(truck.id)
+    if pending is not None and (
+        truck.last_update is None or pending.updated_at > truck.last_update
+    ):
+        set_committed_value(truck, "last_lat", pending.lat)
+        set_committed_value(truck, "last_lng", pending.lng)
+        set_committed_value(truck, "last_speed", pending.speed)
+        set_committed_value(truck, "last_heading", pending.heading)
+        set_committed_value(truck, "last_update", pending.updated_at)
+    return truck
+
+
+def clear_positions():
+    """Drop everything buffered (after the trucks themselves are deleted)."""
+    with _lock:
+        _pending.clear()
+        _latest.clear()
+        del _pending_locations[:]
+
+
+def _write(locations: List[dict], batch: Dict[int, PendingPosition]):
+    """Insert history rows and update truck positions in one transaction."""
+    db = SessionLocal()
+    try:
+        conn = db.connection()
+        if locations:
+            conn.execute(location_insert, locations)
+        if batch:
+            conn.execute(_flush_stmt, [
+                {
+                    "b_id": truck_id,
+                    "b_lat": pos.lat,
+                    "b_lng": pos.lng,
+                    "b_speed": pos.speed,
+                    "b_heading": pos.heading,
+                    "b_updated_at": pos.updated_at
+                }
+                for truck_id, pos in batch.items()
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _write_one_by_one(locations: List[dict], batch: Dict[int, PendingPosition]):
+    """
+    Write rows/positions separately after a failed batch.
+
+    Ones the DB rejects are logged and dropped. Any other error (e.g.
+    the DB is unreachable) stops here: the unwritten history rows are
+    put back for the next flush and the error is raised.
+    """
+    for i, row in enumerate(locations):
+        try:
+            _write([row], {})
+        except (IntegrityError, DataError) as e:
+            logger.error(
+                f"Dropping location of truck {row['truck_id']} at {row['captured_at']}: {e}"
+            )
+        except Exception:
+            with _lock:
+                _pending_locations[:0] = locations[i:]
+            raise
+
+    for truck_id, pos in batch.items():
+        try:
+            _write([], {truck_id: pos})
+        except (IntegrityError, DataError) as e:
+            logger.error(f"Dropping position of truck {truck_id}: {e}")
+
+
+def flush_positions() -> int:
+    """
+    Write all buffered history rows and positions in one transaction.
+
+    If that fails, everything is retried one by one (see
+    _write_one_by_one), so only rows the DB rejects are lost.
+
+    Returns:
+        Number of history rows + trucks flushed (or dropped)
+    """
+    with _lock:
+        batch = dict(_pending)
+        locations = _pending_locations[:]
+        del _pending_locations[:]
+
+    if not batch and not locations:
+        return 0
+
+    try:
+        _write(locations, batch)
+    except Exception as e:
+        logger.warning(f"Batched location flush failed, retrying row by row: {e}")
+        _write_one_by_one(locations, batch)
+
+    # Drop flushed entries, unless a newer position arrived meanwhile
+    with _lock:
+        for truck_id, pos in batch.items():
+            if _pending.get(truck_id) is pos:
+                del _pending[truck_id]
+
+    return len(locations) + len(batch)
+
+
+async def run_position_flusher(interval: float):
+    """Background task: flush pending positions every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(flush_positions)
+        except Exception as e:
+            logger.error(f"Error flushing truck locations: {e}")
@@ -0,0 +1,100 @@
+# app/services/zone_index.py
+"""
+Zone Index
+==========
+In-process lookup table for "which zone contains this point?".
+
+Instead of loading every Zone row and checking each boundary in Python,
+the active zone bounds and names are loaded once (one small SELECT),
+sorted by min_lat, and a point lookup only scans zones whose
+min_lat <= lat. No query is needed per lookup.
+
+The index is rebuilt:
+    - when zones are created/updated/deactivated (invalidate_zone_index)
+    - after ZONE_INDEX_TTL seconds (so other workers pick up changes)
+
+Usage:
+    from app.services.zone_index import find_zone
+    zone = find_zone(db, 12.94, 77.60)   # ZoneMatch(id, name) or None
+"""
+
+import time
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Zone
+
+
+# (zone_id, min_lat, max_lat, min_lng, max_lng)
+ZoneBounds = Tuple[int, float, float, float, float]
+
+
+class ZoneMatch(NamedTuple):
+    """Zone found for a location."""
+    id: int
+    name: str
+
+
+class ZoneIndex:
+    """Active zone boundaries sorted by min_lat."""
+
+    def __init__(self, bounds: List[ZoneBounds], names: Dict[int, str]):
+        self._bounds = sorted(bounds, key=lambda b: b[1])
+        self._min_lats = [b[1] for b in self._bounds]
+        self.names = names
+        self.built_at = time.monotonic()
+
+    def find(self, lat: float, lng: float) -> Optional[int]:
+        """
+        Return the ID of the zone containing the point, or None.
+
+        If zones overlap, the oldest zone (lowest ID) wins.
+        """
+        match = None
+        end = bisect_right(self._min_lats, lat)
+        for zone_id, _, max_lat, min_lng, max_lng in self._bounds[:end]:
+            if lat <= max_lat and min_lng <= lng <= max_lng:
+                if match is None or zone_id < match:
+                    match = zone_id
+        return match
+
+
+_zone_index: Optional[ZoneIndex] = None
+
+
+def get_zone_index(db: Session) -> ZoneIndex:
+    """Return the cached zone index, building it if missing or stale."""
+    global _zone_index
+
+    if (_zone_index is None or
+            time.monotonic() - _zone_index.built_at > settings.ZONE_INDEX_TTL):
+        rows = db.execute(
+            select(Zone.id, Zone.min_lat, Zone.max_lat, Zone.min_lng, Zone.max_lng,
+                   Zone.name)
+            .where(Zone.is_active == True)
+        ).all()
+        _zone_index = ZoneIndex(
+            [tuple(row[:5]) for row in rows],
+            {row.id: row.name for row in rows}
+        )
+
+    return _zone_index
+
+
+def invalidate_zone_index():
+    """Drop the cached index. Call after any zone create/update/delete."""
+    global _zone_index
+    _zone_index = None
+
+
+def find_zone(db: Session, lat: float, lng: float) -> Optional[ZoneMatch]:
+    """Find the active zone (id + name) containing a location."""
+    index = get_zone_index(db)
+    zone_id = index.find(lat, lng)
+    if zone_id is None:
+        return None
+    return ZoneMatch(zone_id, index.names[zone_id])
@@ -0,0 +1,112 @@
+# app/services/zone_snapshots.py
+"""
+Zone Snapshots
+==============
+Short-lived in-process cache of "zone + its truck" for the tracking
+endpoint.
+
+/track/{user_id} is polled every 3-5 seconds by every user, and all
+users of a zone need the same zone and truck rows. Those are loaded
+with one joined SELECT per zone and reused for TRACKING_CACHE_TTL
+seconds, so the per-poll DB work is just the user lookup.
+
+The truck position is never served stale from this process: the
+newest position it recorded (see truck_positions) is applied on read.
+
+The cache is cleared:
+    - when trucks or zones are changed (invalidate_zone_snapshots)
+    - after TRACKING_CACHE_TTL seconds (so other workers pick up changes)
+
+Usage:
+    from app.services.zone_snapshots import get_zone_snapshot
+    snapshot = get_zone_snapshot(db, user.zone_id)
+"""
+
+import time
+from datetime import datetime, time as time_of_day
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Zone, Truck
+from app.services.truck_positions import get_latest_position
+
+
+class ZoneSnapshot(NamedTuple):
+    """Zone fields used by the tracking screen."""
+    id: int
+    name: str
+    typical_start_time: Optional[time_of_day]
+    typical_end_time: Optional[time_of_day]
+
+
+class TruckSnapshot(NamedTuple):
+    """Truck fields used by the tracking screen (same names as Truck)."""
+    id: int
+    vehicle_number: str
+    driver_name: Optional[str]
+    is_active: bool
+    duty_started_at: Optional[datetime]
+    last_lat: Optional[float]
+    last_lng: Optional[float]
+    last_speed: Optional[float]
+    last_heading: Optional[float]
+    last_update: Optional[datetime]
+
+
+# zone_id -> (loaded_at, zone, truck)
+_snapshots: Dict[int, Tuple[float, ZoneSnapshot, Optional[TruckSnapshot]]] = {}
+
+_zone_columns = [getattr(Zone, field) for field in ZoneSnapshot._fields]
+_truck_columns = [getattr(Truck, field) for field in TruckSnapshot._fields]
+
+
+def get_zone_snapshot(
+    db: Session,
+    zone_id: int
+) -> Optional[Tuple[ZoneSnapshot, Optional[TruckSnapshot]]]:
+    """
+    Get a zone and its truck (if any).
+
+    Returns:
+        (zone, truck) tuple, or None if the zone doesn't exist
+    """
+    cached = _snapshots.get(zone_id)
+    if cached is None or time.monotonic() - cached[0] > settings.TRACKING_CACHE_TTL:
+        row = db.execute(
+            select(*_zone_columns, *_truck_columns)
+            .outerjoin(Truck, Truck.zone_id == Zone.id)
+            .where(Zone.id == zone_id)
+        ).first()
+        if row is None:
+            return None
+
+        split = len(_zone_columns)
+        zone = ZoneSnapshot(*row[:split])
+        truck = TruckSnapshot(*row[split:]) if row[split] is not None else None
+        cached = (time.monotonic(), zone, truck)
+        _snapshots[zone_id] = cached
+
+    _, zone, truck = cached
+
+    if truck is not None:
+        latest = get_latest_position(truck.id)
+        if latest is not None and (
+            truck.last_update is None or latest.updated_at > truck.last_update
+        ):
+            truck = truck._replace(
+                last_lat=latest.lat,
+                last_lng=latest.lng,
+                last_speed=latest.speed,
+                last_heading=latest.heading,
+                last_update=latest.updated_at
+            )
+
+    return zone, truck
+
+
+def invalidate_zone_snapshots():
+    """Drop all cached snapshots. Call after any truck/zone change."""
+    _snapshots.clear()
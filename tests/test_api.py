@@ -5,18 +5,30 @@ Garbage Truck Tracker - Complete API Test Suite
 Run this script to test all API endpoints.
 
 Usage:
-    python test_api.py [--base-url http://localhost:8000] [--reset]
+    python test_api.py [--base-url http://localhost:8000] [--reset] [--granular]
+                       [--sync-points N] [--sync-concurrency N]
 
 Options:
     --base-url  : API base URL (default: http://localhost:8000)
     --reset     : Delete database and start fresh before testing
+    --granular  : Alert simulation sends/tracks every route point one by one
+                  (default: batch upload via /sync, track at alert points)
+    --sync-points N : Points queued in the offline sync test (default: 5);
+                  sent as concurrent /sync chunks of SYNC_CHUNK_SIZE
+    --sync-concurrency N : /sync chunks in flight at once (default: 8)
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import io
 import time
 import sys
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from math import asin, cos, radians, sin, sqrt
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -25,6 +37,17 @@ from typing import Optional
 BASE_URL = "http://localhost:8000"
 HEADERS = {"Content-Type": "application/json"}
 
+# One keep-alive session for every call (no new TCP connection per request)
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=2, backoff_factor=0.1))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Methods api_call accepts -> whether `data` goes in the request body
+METHOD_SENDS_BODY = {"GET": False, "POST": True, "PUT": True, "DELETE": False}
+
 # Test data
 TEST_ZONE = {
     "name": "Ward 5 - HSR Layout",
@@ -62,6 +85,31 @@ TRUCK_ROUTE = [
     {"lat": 12.9402, "lng": 77.5998, "speed": 3, "heading": 180}, # 50m - Here alert!
 ]
 
+# Pre-encoded /location bodies for TRUCK_ROUTE; only captured_at is
+# filled in per send
+ROUTE_BODIES = [
+    ('{"lat":%s,"lng":%s,"speed":%s,"heading":%s,"captured_at":"%%s"}'
+     % (p["lat"], p["lng"], p["speed"], p["heading"])).encode()
+    for p in TRUCK_ROUTE
+]
+
+# TRUCK_ROUTE indexes checked around the alert thresholds: last point
+# outside the user's 500m alert distance, then the arriving and here alerts
+ALERT_STEPS = (5, 6, 7)
+
+# Send every TRUCK_ROUTE point + track after each (set by --granular)
+GRANULAR = False
+
+# Offline sync test: queued points (set by --sync-points), split into
+# /sync chunks (server max 1000) of which SYNC_CONCURRENCY are in flight
+# (set by --sync-concurrency)
+OFFLINE_SYNC_POINTS = 5
+SYNC_CHUNK_SIZE = 100
+SYNC_CONCURRENCY = 8
+
+# Pacing of the alert simulation (request time counts toward it)
+STEP_INTERVAL = 0.5  # seconds
+
 
 # ============ HELPER FUNCTIONS ============
 
@@ -77,7 +125,8 @@ class Colors:
 
 
 def print_header(text: str):
-    """Print section header"""
+    """Print section header (output is flushed once per phase, here)"""
+    sys.stdout.flush()
     print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*60}")
     print(f"  {text}")
     print(f"{'='*60}{Colors.END}\n")
@@ -108,40 +157,136 @@ def print_info(text: str):
     print(f"{Colors.CYAN}ℹ️  {text}{Colors.END}")
 
 
-def print_json(data: dict, indent: int = 2):
+def print_lines(lines: list):
+    """Print several lines with one write (nothing if empty)"""
+    if lines:
+        print("\n".join(lines))
+
+
+def print_json(data: dict):
     """Pretty print JSON"""
-    print(json.dumps(data, indent=indent, default=str))
+    print(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2).decode())
+
+
+class _ThreadOutput:
+    """stdout stand-in: threads with a buffer set print into it"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self.local = threading.local()
+    
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self._stream).write(text)
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def run_concurrently(*calls: tuple) -> list:
+    """
+    Run independent tests in parallel, e.g. (test_zone_status, zone_id).
+    Each test's output is printed afterwards, in call order.
+    
+    Returns:
+        The tests' results, in call order
+    """
+    output = _ThreadOutput(sys.stdout)
+    
+    def run(call):
+        func, *args = call
+        output.local.buffer = io.StringIO()
+        try:
+            return func(*args), output.local.buffer.getvalue()
+        finally:
+            output.local.buffer = None
+    
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            outcomes = list(executor.map(run, calls))
+    finally:
+        sys.stdout = output._stream
+    
+    for _, text in outcomes:
+        sys.stdout.write(text)
+    return [result for result, _ in outcomes]
+
+
+def haversine(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters (client-side check of server distances)"""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = radians(lng2 - lng1)
+    a = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlambda / 2) ** 2
+    return 2 * 6371000.0 * asin(sqrt(a))
+
+
+def equirectangular(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Flat-earth distance in meters; well under 0.1% off haversine at
+    city scale (falls back to haversine beyond 50 km)
+    """
+    x = radians(lng2 - lng1) * cos(radians((lat1 + lat2) / 2))
+    y = radians(lat2 - lat1)
+    meters = 6371000.0 * sqrt(x * x + y * y)
+    if meters > 50000:
+        return haversine(lat1, lng1, lat2, lng2)
+    return meters
+
+
+def check_distance(tracking: dict, loc: dict):
+    """Warn if the server's distance is more than 1% off the local estimate"""
+    meters = (tracking.get("distance") or {}).get("meters")
+    if meters is None:
+        return
+    expected = equirectangular(loc["lat"], loc["lng"], TEST_USER["home_lat"], TEST_USER["home_lng"])
+    # Server reports whole meters; allow that rounding on short distances
+    if abs(meters - expected) > max(expected * 0.01, 1):
+        print_warning(f"Server distance {meters} m, expected ~{expected:.0f} m")
 
 
 def api_call(method: str, endpoint: str, data: dict = None, 
-             expected_status: int = None) -> tuple:
+             expected_status: int = None, body: bytes = None,
+             url: str = None, parse_json: bool = True) -> tuple:
     """
     Make API call and return (success, response_data)
+    
+    `body` is sent as-is (already JSON-encoded) instead of `data`.
+    `url` is a full URL built once by the caller (endpoint is ignored).
+    With parse_json=False a successful reply isn't decoded (data is None);
+    errors are still decoded for the message.
     """
-    url = f"{BASE_URL}{endpoint}"
+    if url is None:
+        url = f"{BASE_URL}{endpoint}"
+    
+    sends_body = METHOD_SENDS_BODY.get(method)
+    if sends_body is None:
+        return False, {"error": f"Unknown method: {method}"}
+    
+    if body is None and data is not None and sends_body:
+        body = orjson.dumps(data)
     
     try:
-        if method == "GET":
-            response = requests.get(url, headers=HEADERS)
-        elif method == "POST":
-            response = requests.post(url, headers=HEADERS, json=data)
-        elif method == "PUT":
-            response = requests.put(url, headers=HEADERS, json=data)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=HEADERS)
-        else:
-            return False, {"error": f"Unknown method: {method}"}
-        
-        try:
-            response_data = response.json()
-        except:
-            response_data = {"raw": response.text}
+        response = SESSION.request(
+            method, url,
+            data=body,
+            timeout=5
+        )
         
         if expected_status:
             success = response.status_code == expected_status
         else:
             success = response.status_code in [200, 201]
         
+        if success and not parse_json:
+            return True, None
+        
+        try:
+            response_data = orjson.loads(response.content)
+        except:
+            response_data = {"raw": response.text}
+        
         return success, response_data
         
     except requests.exceptions.ConnectionError:
@@ -195,8 +340,10 @@ def test_list_zones():
     success, data = api_call("GET", "/zones/")
     if success:
         print_success(f"Found {len(data)} zone(s)")
-        for zone in data:
-            print(f"  - {zone['name']} (ID: {zone['id']}, Active: {zone['is_active']})")
+        print_lines([
+            f"  - {zone['name']} (ID: {zone['id']}, Active: {zone['is_active']})"
+            for zone in data
+        ])
         return True
     else:
         print_error(f"Failed to list zones: {data}")
@@ -234,9 +381,11 @@ def test_list_trucks():
     success, data = api_call("GET", "/truck/all")
     if success:
         print_success(f"Found {len(data)} truck(s)")
-        for truck in data:
-            status = "🟢 Active" if truck['is_active'] else "⚪ Inactive"
-            print(f"  - {truck['vehicle_number']} ({status}, Zone: {truck['zone_id']})")
+        print_lines([
+            f"  - {truck['vehicle_number']} "
+            f"({'🟢 Active' if truck['is_active'] else '⚪ Inactive'}, Zone: {truck['zone_id']})"
+            for truck in data
+        ])
         return True
     else:
         print_error(f"Failed to list trucks: {data}")
@@ -374,10 +523,24 @@ def test_send_location(truck_id: int, lat: float, lng: float,
         "lng": lng,
         "speed": speed,
         "heading": heading,
-        "captured_at": datetime.utcnow().isoformat()
+        "captured_at": datetime.utcnow()  # orjson writes ISO 8601
     }
     
-    success, data = api_call("POST", f"/truck/{truck_id}/location", location_data)
+    success, data = api_call("POST", f"/truck/{truck_id}/location", location_data,
+                             expected_status=202, parse_json=False)
+    if success:
+        return True
+    else:
+        print_error(f"Failed to send location: {data}")
+        return False
+
+
+def test_send_route_point(location_url: str, index: int) -> bool:
+    """Send TRUCK_ROUTE[index] to a truck's /location URL (pre-encoded body)"""
+    body = ROUTE_BODIES[index] % datetime.utcnow().isoformat().encode()
+    
+    success, data = api_call("POST", None, body=body, url=location_url,
+                             expected_status=202, parse_json=False)
     if success:
         return True
     else:
@@ -385,9 +548,9 @@ def test_send_location(truck_id: int, lat: float, lng: float,
         return False
 
 
-def test_tracking(user_id: int) -> Optional[dict]:
-    """Test main tracking endpoint"""
-    success, data = api_call("GET", f"/track/{user_id}")
+def test_tracking(user_id: int, url: str = None) -> Optional[dict]:
+    """Test main tracking endpoint (url: prebuilt /track URL, if any)"""
+    success, data = api_call("GET", None, url=url or f"{BASE_URL}/track/{user_id}")
     if success:
         return data
     else:
@@ -417,8 +580,10 @@ def test_nearby_trucks(lat: float, lng: float) -> bool:
     success, data = api_call("GET", f"/track/nearby?lat={lat}&lng={lng}&radius_km=10")
     if success:
         print_success(f"Found {data.get('found', 0)} truck(s) nearby")
-        for truck in data.get('trucks', []):
-            print(f"  - {truck['vehicle_number']}: {truck['distance_text']} away")
+        print_lines([
+            f"  - {truck['vehicle_number']}: {truck['distance_text']} away"
+            for truck in data.get('trucks', [])
+        ])
         return True
     else:
         print_error(f"Failed to find nearby trucks: {data}")
@@ -444,24 +609,60 @@ def test_zone_status(zone_id: int) -> bool:
         return False
 
 
+def sync_locations(truck_id: int, locations: list) -> tuple:
+    """
+    Upload queued locations as /sync chunks of SYNC_CHUNK_SIZE, with up
+    to SYNC_CONCURRENCY chunks in flight (over the shared session).
+    
+    Returns:
+        (success, response_data) - data sums `synced`/`skipped`/`failed`
+        over the chunks, or is the first failing chunk's error
+    """
+    url = f"{BASE_URL}/truck/{truck_id}/sync"
+    chunks = [
+        locations[i:i + SYNC_CHUNK_SIZE]
+        for i in range(0, len(locations), SYNC_CHUNK_SIZE)
+    ]
+    
+    def send(chunk):
+        return api_call("POST", None, {"locations": chunk}, url=url)
+    
+    if len(chunks) == 1:
+        replies = [send(chunks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=SYNC_CONCURRENCY) as executor:
+            replies = list(executor.map(send, chunks))
+    
+    for success, data in replies:
+        if not success:
+            return False, data
+    return True, {
+        "synced": sum(data.get("synced", 0) for _, data in replies),
+        "skipped": sum(data.get("skipped", 0) for _, data in replies),
+        "failed": sum(data.get("failed", 0) for _, data in replies)
+    }
+
+
 def test_offline_sync(truck_id: int) -> bool:
     """Test offline location sync"""
     print_subheader("Offline Sync")
     
-    # Generate batch of offline locations
-    base_time = datetime.utcnow() - timedelta(minutes=10)
+    # Generate batch of offline locations, 30s apart and ending 10 min ago
+    count = OFFLINE_SYNC_POINTS
+    base_time = datetime.utcnow() - timedelta(minutes=10, seconds=(count - 1) * 30)
     locations = []
     
-    for i in range(5):
+    for i in range(count):
+        step = i % 5
         locations.append({
-            "lat": 12.96 - (i * 0.002),
-            "lng": 77.56 + (i * 0.002),
-            "speed": 15 - i,
-            "heading": 135 + (i * 5),
-            "captured_at": (base_time + timedelta(seconds=i*30)).isoformat()
+            "lat": 12.96 - (step * 0.002),
+            "lng": 77.56 + (step * 0.002),
+            "speed": 15 - step,
+            "heading": 135 + (step * 5),
+            "captured_at": base_time + timedelta(seconds=i*30)
         })
     
-    success, data = api_call("POST", f"/truck/{truck_id}/sync", {"locations": locations})
+    success, data = sync_locations(truck_id, locations)
     if success:
         print_success(f"Synced {data.get('synced', 0)} locations")
         return True
@@ -470,61 +671,113 @@ def test_offline_sync(truck_id: int) -> bool:
         return False
 
 
-def test_truck_approach_simulation(truck_id: int, user_id: int):
+def print_tracking_step(step: int, tracking: dict):
+    """Display one simulation step's tracking data"""
+    distance = tracking.get("distance", {})
+    eta = tracking.get("eta", {})
+    status = tracking.get("status", "unknown")
+    alert = tracking.get("alert")
+    
+    # Status emoji
+    status_emoji = {
+        "approaching": "🚛",
+        "arriving": "🚛💨",
+        "here": "🚛✅",
+        "passed": "🚛➡️",
+        "offline": "⚪"
+    }.get(status, "❓")
+    
+    print(f"  {step}. {status_emoji} Status: {status.upper()}")
+    print(f"     📍 Distance: {distance.get('text', 'N/A')}")
+    print(f"     ⏱️  ETA: {eta.get('text', 'N/A')}")
+    
+    # Check for alert
+    if alert and alert.get("should_alert"):
+        print(f"     {Colors.YELLOW}🔔 ALERT: {alert.get('message')}{Colors.END}")
+        if alert.get("play_sound"):
+            print(f"     {Colors.YELLOW}🔊 PLAY SOUND!{Colors.END}")
+    
+    print()
+
+
+def wait_for_next_step(step_started: float):
+    """
+    Sleep out the rest of STEP_INTERVAL since step_started, so the
+    step's own requests count toward the pause instead of adding to it
+    """
+    sys.stdout.flush()
+    remaining = STEP_INTERVAL - (time.monotonic() - step_started)
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def test_truck_approach_simulation(truck_id: int, user_id: int, granular: bool = False):
     """
     Simulate truck approaching user's home.
     Tests alert system at different distances.
+    
+    By default the route is uploaded in /sync batches ending at each
+    ALERT_STEPS point, and tracking is checked only there (3 uploads +
+    3 tracking calls instead of 8 + 8). With granular=True every point
+    is sent and tracked one by one.
     """
     print_subheader("Simulating Truck Approach")
     
     print_info("Sending truck locations and monitoring alerts...")
     print()
     
-    for i, loc in enumerate(TRUCK_ROUTE):
-        # Send location
-        success = test_send_location(
-            truck_id, 
-            loc["lat"], 
-            loc["lng"], 
-            loc["speed"], 
-            loc["heading"]
-        )
+    # Built once; every step hits the same URLs
+    location_url = f"{BASE_URL}/truck/{truck_id}/location"
+    sync_url = f"{BASE_URL}/truck/{truck_id}/sync"
+    track_url = f"{BASE_URL}/track/{user_id}"
+    
+    if granular:
+        for i, loc in enumerate(TRUCK_ROUTE):
+            step_started = time.monotonic()
+            
+            # Send location
+            success = test_send_route_point(location_url, i)
+            
+            if not success:
+                continue
+            
+            # Get tracking data
+            tracking = test_tracking(user_id, track_url)
+            if not tracking:
+                continue
+            
+            print_tracking_step(i + 1, tracking)
+            check_distance(tracking, loc)
+            wait_for_next_step(step_started)
+        return
+    
+    # One captured_at per route point, a second apart, ending now
+    base_time = datetime.utcnow() - timedelta(seconds=len(TRUCK_ROUTE))
+    start = 0
+    
+    for step in ALERT_STEPS:
+        step_started = time.monotonic()
         
+        locations = [
+            {**TRUCK_ROUTE[i],
+             "captured_at": base_time + timedelta(seconds=i)}
+            for i in range(start, step + 1)
+        ]
+        start = step + 1
+        
+        success, data = api_call("POST", None, {"locations": locations}, url=sync_url)
         if not success:
+            print_error(f"Failed to sync locations: {data}")
             continue
         
         # Get tracking data
-        tracking = test_tracking(user_id)
+        tracking = test_tracking(user_id, track_url)
         if not tracking:
             continue
         
-        # Display status
-        distance = tracking.get("distance", {})
-        eta = tracking.get("eta", {})
-        status = tracking.get("status", "unknown")
-        alert = tracking.get("alert")
-        
-        # Status emoji
-        status_emoji = {
-            "approaching": "🚛",
-            "arriving": "🚛💨",
-            "here": "🚛✅",
-            "passed": "🚛➡️",
-            "offline": "⚪"
-        }.get(status, "❓")
-        
-        print(f"  {i+1}. {status_emoji} Status: {status.upper()}")
-        print(f"     📍 Distance: {distance.get('text', 'N/A')}")
-        print(f"     ⏱️  ETA: {eta.get('text', 'N/A')}")
-        
-        # Check for alert
-        if alert and alert.get("should_alert"):
-            print(f"     {Colors.YELLOW}🔔 ALERT: {alert.get('message')}{Colors.END}")
-            if alert.get("play_sound"):
-                print(f"     {Colors.YELLOW}🔊 PLAY SOUND!{Colors.END}")
-        
-        print()
-        time.sleep(0.5)  # Small delay between updates
+        print_tracking_step(step + 1, tracking)
+        check_distance(tracking, TRUCK_ROUTE[step])
+        wait_for_next_step(step_started)
 
 
 def test_debug_database() -> bool:
@@ -534,15 +787,9 @@ def test_debug_database() -> bool:
     success, data = api_call("GET", "/debug/db")
     if success:
         print_success("Database state:")
-        print(f"\n  Zones ({len(data.get('zones', []))}):")
-        for z in data.get('zones', []):
-            print(f"    - {z}")
-        print(f"\n  Trucks ({len(data.get('trucks', []))}):")
-        for t in data.get('trucks', []):
-            print(f"    - {t}")
-        print(f"\n  Users ({len(data.get('users', []))}):")
-        for u in data.get('users', []):
-            print(f"    - {u}")
+        for title, key in (("Zones", "zones"), ("Trucks", "trucks"), ("Users", "users")):
+            rows = data.get(key, [])
+            print_lines([f"\n  {title} ({len(rows)}):"] + [f"    - {row}" for row in rows])
         return True
     else:
         print_warning("Debug endpoint not available (add it to main.py)")
@@ -671,26 +918,22 @@ def run_all_tests():
     # ========== PHASE 7: ALERT SIMULATION ==========
     print_header("PHASE 7: Alert Simulation")
     
-    test_truck_approach_simulation(truck_id, user_id)
+    test_truck_approach_simulation(truck_id, user_id, GRANULAR)
     results["passed"] += 1  # Simulation always "passes"
     
     # ========== PHASE 8: ADDITIONAL ENDPOINTS ==========
     print_header("PHASE 8: Additional Endpoints")
     
-    if test_route_history(user_id):
-        results["passed"] += 1
-    else:
-        results["failed"] += 1
-    
-    if test_nearby_trucks(TEST_USER["home_lat"], TEST_USER["home_lng"]):
-        results["passed"] += 1
-    else:
-        results["failed"] += 1
-    
-    if test_zone_status(zone_id):
-        results["passed"] += 1
-    else:
-        results["failed"] += 1
+    # Read-only checks, independent of each other
+    for passed in run_concurrently(
+        (test_route_history, user_id),
+        (test_nearby_trucks, TEST_USER["home_lat"], TEST_USER["home_lng"]),
+        (test_zone_status, zone_id)
+    ):
+        if passed:
+            results["passed"] += 1
+        else:
+            results["failed"] += 1
     
     # ========== PHASE 9: OFFLINE SYNC ==========
     print_header("PHASE 9: Offline Sync")
@@ -740,12 +983,28 @@ if __name__ == "__main__":
         if idx + 1 < len(sys.argv):
             BASE_URL = sys.argv[idx + 1]
     
+    if "--granular" in sys.argv:
+        GRANULAR = True
+    
+    if "--sync-points" in sys.argv:
+        idx = sys.argv.index("--sync-points")
+        if idx + 1 < len(sys.argv):
+            OFFLINE_SYNC_POINTS = int(sys.argv[idx + 1])
+    
+    if "--sync-concurrency" in sys.argv:
+        idx = sys.argv.index("--sync-concurrency")
+        if idx + 1 < len(sys.argv):
+            SYNC_CONCURRENCY = int(sys.argv[idx + 1])
+    
     if "--reset" in sys.argv:
         db_file = "garbage_tracker.db"
         if os.path.exists(db_file):
             os.remove(db_file)
             print(f"Deleted {db_file}")
     
+    # Block-buffer stdout even on a terminal; print_header flushes per phase
+    sys.stdout.reconfigure(line_buffering=False)
+    
     # Run tests
     try:
         run_all_tests()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+WebSocket ConnectionManager Tests
+=================================
+Checks that a socket whose writer fails is dropped and closed.
+Runs without a server.
+
+Usage:
+    DEBUG=false python -m pytest tests/test_websocket.py
+"""
+
+import asyncio
+
+from app.routes.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """Stand-in WebSocket whose send_text raises `error`."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.close_codes = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        raise self.error
+
+    async def close(self, code: int = 1000):
+        self.close_codes.append(code)
+
+
+def run_failed_send(error: Exception):
+    """Connect a FakeWebSocket, send one message and return (manager, ws)."""
+    async def scenario():
+        manager = ConnectionManager()
+        ws = FakeWebSocket(error)
+        await manager.connect(ws, user_id=1, zone_id=1)
+        manager.send(ws, 1, {"type": "pong"})
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return manager, ws
+
+    return asyncio.run(scenario())
+
+
+def test_send_error_closes_socket():
+    manager, ws = run_failed_send(RuntimeError("broken pipe"))
+    assert ws.close_codes == [1011]
+    assert 1 not in manager.user_connections
+    assert ws not in manager.outboxes
+
+
+def test_send_timeout_closes_socket():
+    manager, ws = run_failed_send(asyncio.TimeoutError())
+    assert ws.close_codes == [1013]
+    assert 1 not in manager.user_connections